@@ -1,10 +1,37 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from fastapi.staticfiles import StaticFiles
-from src.apis import router
+from src.apis import router, internal_router
+from src.media import MediaFiles
+from src.migrate import upgrade
+from src.moderation import review_workers
+from src.mail import mail_dispatcher
+from src import baidu
+from src.config import THREADPOOL_SIZE, MIGRATE_ON_STARTUP
+from src.database import async_engine
+from anyio import to_thread
 import os
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 同步模式下每个请求占用一个线程，线程数应与连接池大小相匹配
+    to_thread.current_default_thread_limiter().total_tokens = THREADPOOL_SIZE
+    # 迁移失败时直接终止启动，避免在缺少表的数据库上运行
+    if MIGRATE_ON_STARTUP:
+        upgrade()
+    review_workers.start()
+    mail_dispatcher.start()
+    yield
+    review_workers.stop()
+    mail_dispatcher.stop()
+    await baidu.aclose()
+    if async_engine is not None:
+        await async_engine.dispose()
+
+
+app = FastAPI(lifespan=lifespan)
 app.include_router(router)
+app.include_router(internal_router)
 if not os.path.exists('uploads'):
     os.makedirs('uploads')
-app.mount("/files", StaticFiles(directory='uploads'), name="files")
+app.mount("/files", MediaFiles(directory='uploads'), name="files")
@@ -0,0 +1,199 @@
+"""baseline
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 10:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def _id():
+    return sa.Column('id', sa.BIGINT(), primary_key=True, autoincrement=True)
+
+
+def _create_table(existing, created, name, *columns):
+    if name not in existing:
+        op.create_table(name, *columns)
+        created.add(name)
+
+
+def upgrade():
+    # 本系列之前由create_all建表的数据库没有版本记录，也可能缺少后来加入的表：
+    # 这里只创建不存在的表，已有的表保持不变
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+    created = set()
+    _create_table(
+        existing, created,
+        'config',
+        sa.Column('smtp_server', sa.VARCHAR(255)),
+        sa.Column('smtp_port', sa.INT()),
+        sa.Column('sender_email', sa.VARCHAR(255), primary_key=True),
+        sa.Column('sender_password', sa.VARCHAR(255)),
+        sa.Column('api_key', sa.VARCHAR(255)),
+        sa.Column('secret_key', sa.VARCHAR(255)),
+    )
+    _create_table(
+        existing, created,
+        'user',
+        sa.Column('uid', sa.BIGINT(), primary_key=True, autoincrement=True),
+        sa.Column('account', sa.VARCHAR(16), nullable=False),
+        sa.Column('email', sa.VARCHAR(255), nullable=False),
+        sa.Column('password', sa.VARCHAR(512), nullable=False),
+        sa.Column('sex', sa.INT()),
+        sa.Column('nickname', sa.VARCHAR(50)),
+        sa.Column('avatar', sa.VARCHAR(255)),
+        sa.Column('desc', sa.VARCHAR(255)),
+        sa.Column('exp', sa.INT(), nullable=False),
+        sa.Column('signup_time', sa.DATETIME(), nullable=False),
+        sa.Column('admin', sa.BOOLEAN()),
+        sa.Column('disable_reminder', sa.INT()),
+        sa.Column('remind_after', sa.DATETIME()),
+    )
+    if 'user' in created:
+        op.create_index('ix_user_uid', 'user', ['uid'], unique=True)
+        op.create_index('ix_user_account', 'user', ['account'], unique=True)
+        op.create_index('ix_user_email', 'user', ['email'], unique=True)
+    _create_table(
+        existing, created,
+        'token',
+        _id(),
+        sa.Column('uid', sa.BIGINT(), nullable=False),
+        sa.Column('token', sa.VARCHAR(255), nullable=False),
+        sa.Column('expire_time', sa.DATETIME(), nullable=False),
+    )
+    _create_table(
+        existing, created,
+        'verification',
+        _id(),
+        sa.Column('email', sa.VARCHAR(255), nullable=False),
+        sa.Column('code', sa.VARCHAR(6), nullable=False),
+        sa.Column('expire_time', sa.DATETIME(), nullable=False),
+    )
+    _create_table(
+        existing, created,
+        'uploaded_file',
+        _id(),
+        sa.Column('url', sa.VARCHAR(512), nullable=False),
+        sa.Column('filename', sa.VARCHAR(255), nullable=False),
+        sa.Column('uid', sa.BIGINT(), nullable=False),
+        sa.Column('upload_time', sa.DATETIME(), nullable=False),
+    )
+    _create_table(
+        existing, created,
+        'article',
+        _id(),
+        sa.Column('uid', sa.BIGINT(), nullable=False),
+        sa.Column('submit_time', sa.DATETIME(), nullable=False),
+        sa.Column('title', sa.VARCHAR(50), nullable=False),
+        sa.Column('content', sa.TEXT(), nullable=False),
+        sa.Column('preview', sa.VARCHAR(51), nullable=False),
+        sa.Column('status', sa.INT(), nullable=False),
+        sa.Column('desc', sa.VARCHAR(255)),
+    )
+    _create_table(
+        existing, created,
+        'video',
+        _id(),
+        sa.Column('uid', sa.BIGINT(), nullable=False),
+        sa.Column('submit_time', sa.DATETIME(), nullable=False),
+        sa.Column('title', sa.VARCHAR(50), nullable=False),
+        sa.Column('cover', sa.VARCHAR(255), nullable=False),
+        sa.Column('video', sa.VARCHAR(255), nullable=False),
+        sa.Column('status', sa.INT(), nullable=False),
+        sa.Column('desc', sa.VARCHAR(255)),
+    )
+    _create_table(
+        existing, created,
+        'collection',
+        _id(),
+        sa.Column('uid', sa.BIGINT(), nullable=False),
+        sa.Column('submission_id', sa.BIGINT(), nullable=False),
+        sa.Column('type', sa.INT(), nullable=False),
+        sa.Column('time', sa.DATETIME(), nullable=False),
+    )
+    _create_table(
+        existing, created,
+        'comment',
+        _id(),
+        sa.Column('uid', sa.BIGINT(), nullable=False),
+        sa.Column('content', sa.VARCHAR(255), nullable=False),
+        sa.Column('time', sa.DATETIME(), nullable=False),
+        sa.Column('submission_id', sa.BIGINT(), nullable=False),
+        sa.Column('type', sa.INT(), nullable=False),
+    )
+    _create_table(
+        existing, created,
+        'follow',
+        _id(),
+        sa.Column('uid', sa.BIGINT(), nullable=False),
+        sa.Column('follower_id', sa.BIGINT(), nullable=False),
+    )
+    _create_table(
+        existing, created,
+        'search_index',
+        _id(),
+        sa.Column('token', sa.VARCHAR(32), nullable=False),
+        sa.Column('submission_id', sa.BIGINT(), nullable=False),
+        sa.Column('type', sa.INT(), nullable=False),
+        sa.Column('weight', sa.INT(), nullable=False),
+        sa.Column('submit_time', sa.DATETIME(), nullable=False),
+    )
+    if 'search_index' in created:
+        op.create_index('ix_search_index_token',
+                        'search_index', ['token'])
+        op.create_index('ix_search_index_submission_id',
+                        'search_index', ['submission_id'])
+    _create_table(
+        existing, created,
+        'review_task',
+        _id(),
+        sa.Column('submission_id', sa.BIGINT(), nullable=False),
+        sa.Column('type', sa.INT(), nullable=False),
+        sa.Column('uid', sa.BIGINT(), nullable=False),
+        sa.Column('content', sa.TEXT(), nullable=False),
+        sa.Column('status', sa.INT(), nullable=False),
+        sa.Column('attempts', sa.INT(), nullable=False),
+        sa.Column('next_run_time', sa.DATETIME(), nullable=False),
+        sa.Column('last_error', sa.VARCHAR(255)),
+    )
+    if 'review_task' in created:
+        op.create_index('ix_review_task_status', 'review_task', ['status'])
+    _create_table(
+        existing, created,
+        'summary_cache',
+        sa.Column('hash', sa.VARCHAR(64), primary_key=True),
+        sa.Column('summary', sa.TEXT(), nullable=False),
+        sa.Column('create_time', sa.DATETIME(), nullable=False),
+    )
+    _create_table(
+        existing, created,
+        'user_stats',
+        sa.Column('uid', sa.BIGINT(), primary_key=True, autoincrement=False),
+        sa.Column('article_total', sa.INT(), nullable=False),
+        sa.Column('video_total', sa.INT(), nullable=False),
+        sa.Column('follower_total', sa.INT(), nullable=False),
+        sa.Column('unread_reply', sa.INT(), nullable=False),
+    )
+    for table in ('token', 'verification', 'uploaded_file', 'article', 'video',
+                  'collection', 'comment', 'follow', 'search_index', 'review_task'):
+        if table in created:
+            op.create_index(f'ix_{table}_id', table, ['id'], unique=True)
+    # user_stats在加入unread_reply之前就可能已由create_all建出
+    if 'user_stats' in existing and 'unread_reply' not in {
+            column['name'] for column in sa.inspect(op.get_bind()).get_columns('user_stats')}:
+        op.add_column('user_stats', sa.Column(
+            'unread_reply', sa.INT(), nullable=False, server_default='0'))
+
+
+def downgrade():
+    for table in ('user_stats', 'summary_cache', 'review_task', 'search_index', 'follow',
+                  'comment', 'collection', 'video', 'article', 'uploaded_file',
+                  'verification', 'token', 'user', 'config'):
+        op.drop_table(table)
@@ -0,0 +1,42 @@
+"""indexes for the query patterns in apis.py
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 10:30:00
+
+"""
+from alembic import op
+
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ('ix_token_token', 'token', ['token']),
+    ('ix_verification_email_expire_time', 'verification', ['email', 'expire_time']),
+    ('ix_uploaded_file_uid', 'uploaded_file', ['uid']),
+    ('ix_article_status_submit_time', 'article', ['status', 'submit_time']),
+    ('ix_article_uid_status_submit_time', 'article', ['uid', 'status', 'submit_time']),
+    ('ix_video_status_submit_time', 'video', ['status', 'submit_time']),
+    ('ix_video_uid_status_submit_time', 'video', ['uid', 'status', 'submit_time']),
+    ('ix_collection_uid_time', 'collection', ['uid', 'time']),
+    ('ix_collection_uid_type_submission_id', 'collection', ['uid', 'type', 'submission_id']),
+    ('ix_comment_submission_id_type_time', 'comment', ['submission_id', 'type', 'time']),
+    ('ix_follow_uid_follower_id', 'follow', ['uid', 'follower_id']),
+    ('ix_follow_follower_id', 'follow', ['follower_id']),
+    ('ix_review_task_status_next_run_time', 'review_task', ['status', 'next_run_time']),
+]
+
+
+def upgrade():
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns)
+    # 已被(status, next_run_time)覆盖
+    op.drop_index('ix_review_task_status', table_name='review_task')
+
+
+def downgrade():
+    op.create_index('ix_review_task_status', 'review_task', ['status'])
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,44 @@
+"""unified submission table for mixed article/video feeds
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 14:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'submission',
+        sa.Column('id', sa.BIGINT(), primary_key=True, autoincrement=False),
+        sa.Column('type', sa.INT(), primary_key=True, autoincrement=False),
+        sa.Column('uid', sa.BIGINT(), nullable=False),
+        sa.Column('status', sa.INT(), nullable=False),
+        sa.Column('submit_time', sa.DATETIME(), nullable=False),
+        sa.Column('title', sa.VARCHAR(50), nullable=False),
+        sa.Column('preview', sa.VARCHAR(255), nullable=False),
+        sa.Column('desc', sa.VARCHAR(255)),
+    )
+    op.create_index('ix_submission_status_submit_time', 'submission',
+                    ['status', 'submit_time', 'type', 'id'])
+    op.create_index('ix_submission_uid_status_submit_time', 'submission',
+                    ['uid', 'status', 'submit_time', 'type', 'id'])
+    op.create_index('ix_submission_uid_submit_time', 'submission',
+                    ['uid', 'submit_time', 'type', 'id'])
+    op.execute(
+        'INSERT INTO submission (id, type, uid, status, submit_time, title, preview, `desc`) '
+        'SELECT id, 0, uid, status, submit_time, title, preview, `desc` FROM article')
+    op.execute(
+        'INSERT INTO submission (id, type, uid, status, submit_time, title, preview, `desc`) '
+        'SELECT id, 1, uid, status, submit_time, title, cover, `desc` FROM video')
+
+
+def downgrade():
+    op.drop_table('submission')
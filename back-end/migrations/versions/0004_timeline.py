@@ -0,0 +1,51 @@
+"""per-follower timelines for the followed feed
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 16:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+CELEBRITY_THRESHOLD = 1000
+
+
+def upgrade():
+    op.add_column('user_stats', sa.Column(
+        'celebrity', sa.BOOLEAN(), nullable=False, server_default='0'))
+    op.create_table(
+        'timeline',
+        sa.Column('id', sa.BIGINT(), primary_key=True, autoincrement=True),
+        sa.Column('uid', sa.BIGINT(), nullable=False),
+        sa.Column('type', sa.INT(), nullable=False),
+        sa.Column('submission_id', sa.BIGINT(), nullable=False),
+        sa.Column('author_uid', sa.BIGINT(), nullable=False),
+        sa.Column('submit_time', sa.DATETIME(), nullable=False),
+    )
+    op.create_index('ix_timeline_uid_submit_time', 'timeline',
+                    ['uid', 'submit_time', 'type', 'submission_id'])
+    op.create_index('ix_timeline_uid_type_submission_id', 'timeline',
+                    ['uid', 'type', 'submission_id'], unique=True)
+    op.create_index('ix_timeline_type_submission_id', 'timeline',
+                    ['type', 'submission_id'])
+    op.create_index('ix_timeline_uid_author_uid', 'timeline',
+                    ['uid', 'author_uid'])
+    op.execute(
+        f'UPDATE user_stats SET celebrity = follower_total >= {CELEBRITY_THRESHOLD}')
+    op.execute(
+        'INSERT INTO timeline (uid, type, submission_id, author_uid, submit_time) '
+        'SELECT DISTINCT f.follower_id, s.type, s.id, s.uid, s.submit_time '
+        'FROM follow f JOIN submission s ON s.uid = f.uid AND s.status = 1 '
+        'LEFT JOIN user_stats us ON us.uid = f.uid '
+        'WHERE us.celebrity IS NULL OR us.celebrity = 0')
+
+
+def downgrade():
+    op.drop_table('timeline')
+    op.drop_column('user_stats', 'celebrity')
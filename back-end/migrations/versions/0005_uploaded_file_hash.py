@@ -0,0 +1,25 @@
+"""content hash on uploaded_file for deduplicated uploads
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 20:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # 旧文件不回填哈希，保留原地址，只有新上传的文件参与去重
+    op.add_column('uploaded_file', sa.Column('hash', sa.VARCHAR(64), nullable=True))
+    op.create_index('ix_uploaded_file_hash', 'uploaded_file', ['hash'])
+
+
+def downgrade():
+    op.drop_index('ix_uploaded_file_hash', table_name='uploaded_file')
+    op.drop_column('uploaded_file', 'hash')
@@ -0,0 +1,56 @@
+"""covering index on search_index and a cap on postings per token
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 22:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+# 与search.MAX_POSTINGS一致
+MAX_POSTINGS = 5000
+
+search_index = sa.table(
+    'search_index',
+    sa.column('token'),
+    sa.column('weight'),
+    sa.column('submit_time'),
+)
+
+
+def _prune_postings():
+    ''' 将已有索引中行数超过MAX_POSTINGS的词裁剪到按(权重, 投稿时间)排序的前MAX_POSTINGS行 '''
+    connection = op.get_bind()
+    hot = connection.execute(
+        sa.select(search_index.c.token).group_by(search_index.c.token).having(
+            sa.func.count() > MAX_POSTINGS)).scalars().all()
+    for token in hot:
+        weight, submit_time = connection.execute(
+            sa.select(search_index.c.weight, search_index.c.submit_time).where(
+                search_index.c.token == token).order_by(
+                search_index.c.weight.desc(), search_index.c.submit_time.desc()).offset(
+                MAX_POSTINGS).limit(1)).one()
+        connection.execute(search_index.delete().where(
+            search_index.c.token == token,
+            sa.or_(search_index.c.weight < weight,
+                   sa.and_(search_index.c.weight == weight,
+                           search_index.c.submit_time <= submit_time))))
+
+
+def upgrade():
+    op.create_index('ix_search_index_token_cover', 'search_index',
+                    ['token', 'type', 'submission_id', 'weight', 'submit_time'])
+    # 已是覆盖索引的前缀
+    op.drop_index('ix_search_index_token', table_name='search_index')
+    _prune_postings()
+
+
+def downgrade():
+    op.create_index('ix_search_index_token', 'search_index', ['token'])
+    op.drop_index('ix_search_index_token_cover', table_name='search_index')
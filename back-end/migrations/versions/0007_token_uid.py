@@ -0,0 +1,22 @@
+"""index on token.uid for deleting a user's tokens
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-19 10:00:00
+
+"""
+from alembic import op
+
+revision = '0007'
+down_revision = '0006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # /user/reset按uid删除该用户的全部token
+    op.create_index('ix_token_uid', 'token', ['uid'])
+
+
+def downgrade():
+    op.drop_index('ix_token_uid', table_name='token')
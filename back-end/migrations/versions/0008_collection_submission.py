@@ -0,0 +1,22 @@
+"""index on collection(submission_id, type) for deleting a collection by submission
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-19 10:10:00
+
+"""
+from alembic import op
+
+revision = '0008'
+down_revision = '0007'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # /user/delCollection按(submission_id, type)查找，(uid, type, submission_id)以uid开头无法使用
+    op.create_index('ix_collection_submission_id_type', 'collection', ['submission_id', 'type'])
+
+
+def downgrade():
+    op.drop_index('ix_collection_submission_id_type', table_name='collection')
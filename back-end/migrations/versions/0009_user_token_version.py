@@ -0,0 +1,23 @@
+"""per-user token version so revocations reach every worker's token cache
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-19 11:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0009'
+down_revision = '0008'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('user', sa.Column(
+        'token_version', sa.INT(), nullable=False, server_default='0'))
+
+
+def downgrade():
+    op.drop_column('user', 'token_version')
@@ -0,0 +1,191 @@
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from sqlalchemy.exc import IntegrityError
+from starlette.concurrency import run_in_threadpool
+from .database import SessionLocal
+from .models import SummaryCache
+from .cache import TTLCache, SingleFlight
+from . import baidu, utils
+
+SUMMARY_LEN = 200
+
+_summary_memory = TTLCache(maxsize=4096)
+_summary_flight = SingleFlight()
+
+
+def summary_key(title: str, content: str, max_summary_len=SUMMARY_LEN):
+    raw = json.dumps([title, content, max_summary_len], ensure_ascii=False)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def _load_summary(key: str):
+    db = SessionLocal()
+    try:
+        row = db.query(SummaryCache.summary).filter(
+            SummaryCache.hash == key).first()
+        return row.summary if row else None
+    finally:
+        db.close()
+
+
+def _store_summary(key: str, text: str):
+    db = SessionLocal()
+    try:
+        db.add(SummaryCache(hash=key, summary=text, create_time=utils.time()))
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+    finally:
+        db.close()
+
+
+async def _fetch_summary(key: str, title: str, content: str):
+    text = await run_in_threadpool(_load_summary, key)
+    if text is None:
+        text = await baidu.summary(title, content, SUMMARY_LEN)
+        await run_in_threadpool(_store_summary, key, text)
+    _summary_memory.set(key, text)
+    return text
+
+
+async def summary(title: str, content: str):
+    '''
+    按(title, content, max_summary_len)的哈希缓存摘要：先查内存LRU，再查summary_cache表，
+    都未命中时才调用接口，相同内容的并发请求共享一次调用
+    '''
+    key = summary_key(title, content)
+    text = _summary_memory.get(key)
+    if text is not None:
+        return text
+    return await _summary_flight.do(key, lambda: _fetch_summary(key, title, content))
+
+
+class ImageResultCache:
+    '''
+    图片处理结果缓存：内存中按总字节数做LRU淘汰，被淘汰的结果写入磁盘，
+    磁盘占用超过上限时删除最久未访问的文件
+    '''
+
+    def __init__(self, directory='cache/images', memory_limit=64 * 1024 * 1024,
+                 disk_limit=2 * 1024 * 1024 * 1024):
+        self.directory = directory
+        self.memory_limit = memory_limit
+        self.disk_limit = disk_limit
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._disk_bytes = None
+        self._lock = threading.Lock()
+
+    def _path(self, key: str):
+        return os.path.join(self.directory, *key.split('/'))
+
+    def get_memory(self, key: str):
+        with self._lock:
+            value = self._memory.get(key)
+            if value is not None:
+                self._memory.move_to_end(key)
+            return value
+
+    def get(self, key: str):
+        value = self.get_memory(key)
+        if value is not None:
+            return value
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='ascii') as f:
+                value = f.read()
+            os.utime(path)
+        except OSError:
+            return None
+        self.set(key, value)
+        return value
+
+    def set(self, key: str, value: str):
+        evicted = []
+        with self._lock:
+            old = self._memory.pop(key, None)
+            if old is not None:
+                self._memory_bytes -= len(old)
+            self._memory[key] = value
+            self._memory_bytes += len(value)
+            while self._memory_bytes > self.memory_limit and len(self._memory) > 1:
+                old_key, old_value = self._memory.popitem(last=False)
+                self._memory_bytes -= len(old_value)
+                evicted.append((old_key, old_value))
+        for old_key, old_value in evicted:
+            self._spill(old_key, old_value)
+
+    def _spill(self, key: str, value: str):
+        path = self._path(key)
+        if os.path.exists(path):
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f'{path}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'w', encoding='ascii') as f:
+            f.write(value)
+        os.replace(tmp_path, path)
+        with self._lock:
+            if self._disk_bytes is None:
+                self._disk_bytes = sum(size for _, _, size in self._scan())
+            else:
+                self._disk_bytes += len(value)
+            if self._disk_bytes <= self.disk_limit:
+                return
+        self._prune()
+
+    def _scan(self):
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                yield path, stat.st_mtime, stat.st_size
+
+    def _prune(self):
+        files = sorted(self._scan(), key=lambda item: item[1])
+        total = sum(size for _, _, size in files)
+        for path, _, size in files:
+            if total <= self.disk_limit * 0.9:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+        with self._lock:
+            self._disk_bytes = total
+
+
+_image_cache = ImageResultCache()
+_image_flight = SingleFlight()
+
+
+def image_key(image: str, api: str):
+    return f'{api}/{hashlib.sha256(image.encode("utf-8")).hexdigest()}'
+
+
+async def _fetch_image(key: str, image: str, api: str):
+    result = await run_in_threadpool(_image_cache.get, key)
+    if result is None:
+        result = await baidu.ai_image_procssing(image, api)
+        await run_in_threadpool(_image_cache.set, key, result)
+    return result
+
+
+async def ai_image_procssing(image: str, api: str):
+    '''
+    按(api, sha256(image))缓存图片处理结果，相同图片的并发请求共享一次调用，
+    重试时不再消耗接口额度
+    '''
+    if api not in baidu.IMAGE_APIS:
+        raise KeyError(api)
+    key = await run_in_threadpool(image_key, image, api)
+    result = _image_cache.get_memory(key)
+    if result is not None:
+        return result
+    return await _image_flight.do(key, lambda: _fetch_image(key, image, api))
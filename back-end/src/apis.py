@@ -1,23 +1,51 @@
-from fastapi import APIRouter, Header, UploadFile, File
-from sqlalchemy import union_all, desc, func, literal, or_
-from .database import SessionLocal
+import inspect
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, UploadFile, File, Request
+from fastapi.routing import APIRoute
+from sqlalchemy.orm import Session, undefer
+from .database import get_db, engine, async_engine, run_in_greenlet, run_db, \
+    pool_monitor, async_pool_monitor
 from .models import *
 from .schemas import *
 from .utils import *
+from .search import index_submission, remove_submission, search
+from .paging import paginate, next_cursor, fetch_page, count_total, InvalidCursor, SUBMISSION_SCOPES
+from .cache import invalidate
+from .http_cache import cached_response
+from .hydration import load_users, load_submissions, load_details
+from .submissions import sync_submission, delete_submission, FEED_KEYS
+from . import queries
+from .moderation import enqueue_review, review_workers
+from . import stats, timeline
+from .mail import send_code, mail_dispatcher
+from .baidu import token_manager
+from .ai_cache import summary, ai_image_procssing
 
-router = APIRouter(prefix="/api")
+
+class DatabaseRoute(APIRoute):
+    ''' 异步数据库模式下，同步的接口函数改为在事件循环中通过greenlet执行，不再占用线程池 '''
+
+    def __init__(self, path, endpoint, **kwargs):
+        if async_engine is not None and not inspect.iscoroutinefunction(endpoint):
+            endpoint = run_in_greenlet(endpoint)
+        super().__init__(path, endpoint, **kwargs)
+
+
+router = APIRouter(prefix="/api", route_class=DatabaseRoute)
+# 运维接口不在/api下，前端开发服务器与反向代理只转发/api，不会把外部请求转发到这里
+internal_router = APIRouter(prefix="/internal")
+INTERNAL_HOSTS = ('127.0.0.1', '::1')
+FORWARDED_HEADERS = ('forwarded', 'x-forwarded-for', 'x-real-ip')
 
 
 @router.post('/user/signup')
-def user_signup(data: UserSignup):
-    db = SessionLocal()
+def user_signup(data: UserSignup, db: Session = Depends(get_db)):
     try:
         if db.query(User).filter(User.account == data.account).first():
             return error('ACCOUNT_EXIST')
         if db.query(User).filter(User.email == data.email).first():
             return error('EMAIL_EXIST')
-        verification = db.query(Verification).filter(
-            Verification.email == data.email).order_by(Verification.expire_time.desc()).first()
+        verification = queries.latest_verification(db, data.email).first()
         if not verification or verification.code != data.code or verification.expire_time < time():
             return error('CODE_ERROR')
         new_user = User(
@@ -33,6 +61,7 @@ def user_signup(data: UserSignup):
         db.flush()
         db.refresh(new_user)
         new_user.password = hash_password(data.password, new_user.uid)
+        db.add(UserStats(uid=new_user.uid))
         db.commit()
         db.query(Verification).filter(
             Verification.email == data.email).delete()
@@ -45,13 +74,9 @@ def user_signup(data: UserSignup):
 
 
 @router.post('/user/login')
-def user_login(data: UserLogin):
-    db = SessionLocal()
+def user_login(data: UserLogin, db: Session = Depends(get_db)):
     try:
-        isEmail = '@' in data.accountOrEmail
-        user = db.query(User).filter(
-            User.email == data.accountOrEmail if isEmail else User.account == data.accountOrEmail
-        ).first()
+        user = queries.user_by_login(db, data.accountOrEmail).first()
         if not user:
             return error('NOT_CORRECT')
         if user.password != hash_password(data.password, user.uid):
@@ -74,14 +99,12 @@ def user_login(data: UserLogin):
 
 
 @router.post('/user/reset')
-def user_reset(data: UserReset):
-    db = SessionLocal()
+def user_reset(data: UserReset, db: Session = Depends(get_db)):
     try:
         user = db.query(User).filter(User.email == data.email).first()
         if not user:
             return error('EMAIL_NOT_EXIST')
-        verification = db.query(Verification).filter(
-            Verification.email == data.email).order_by(Verification.expire_time.desc()).first()
+        verification = queries.latest_verification(db, data.email).first()
         if not verification or verification.code != data.code or verification.expire_time < time():
             return error('CODE_ERROR')
         user.password = hash_password(data.password, user.uid)
@@ -89,8 +112,9 @@ def user_reset(data: UserReset):
         db.query(Verification).filter(
             Verification.email == data.email).delete()
         db.commit()
-        db.query(Token).filter(Token.uid == user.uid).delete()
+        revoke_tokens(db, user.uid)
         db.commit()
+        invalidate_tokens(user.uid)
         return success()
     except Exception as e:
         db.rollback()
@@ -99,8 +123,7 @@ def user_reset(data: UserReset):
 
 
 @router.post('/user/sendCode')
-def user_send_code(data: UserSendCode, lang: str = Header(None)):
-    db = SessionLocal()
+def user_send_code(data: UserSendCode, lang: str = Header(None), db: Session = Depends(get_db)):
     try:
         user = db.query(User).filter(User.email == data.email).first()
         if data.isNewEmail and user:
@@ -127,23 +150,15 @@ def user_send_code(data: UserSendCode, lang: str = Header(None)):
 
 
 @router.post('/user/getInfo')
-def user_get_info(data: CommonUid, token: str = Header(None)):
-    db = SessionLocal()
+def user_get_info(data: CommonUid, token: str = Header(None), db: Session = Depends(get_db)):
     try:
         uid = data.uid or verify_token(token)
         if not uid:
             return error('NOT_LOGIN')
-        user = db.query(User).filter(User.uid == uid).first()
-        articles = db.query(Article.id).filter(Article.uid == uid)
-        videos = db.query(Video.id).filter(Video.uid == uid)
-        comment_total = db.query(Comment).filter(
-            (Comment.uid != uid) & (Comment.time > user.remind_after) & ((
-                (Comment.type == 0) & Comment.submission_id.in_(articles)
-            ) | (
-                (Comment.type == 1) & Comment.submission_id.in_(videos)
-            ))).count()
-        db.close()
-        return success({
+        user, user_stats = queries.user_with_stats(db, uid).first()
+        if not user_stats:
+            user_stats = stats.ensure_stats(db, uid)
+        result = {
             'uid': user.uid,
             'account': user.account,
             'email': mask_email(user.email),
@@ -155,12 +170,14 @@ def user_get_info(data: CommonUid, token: str = Header(None)):
             'signupTime': user.signup_time,
             'admin': user.admin,
             'msgNum': {
-                'reply': comment_total,
+                'reply': user_stats.unread_reply,
             },
             'showReminder': {
                 'reply': (user.disable_reminder or 0) & 1 == 0,
             },
-        })
+        }
+        db.commit()
+        return success(result)
     except Exception as e:
         db.rollback()
         print(e.args)
@@ -168,8 +185,7 @@ def user_get_info(data: CommonUid, token: str = Header(None)):
 
 
 @router.post('/user/update')
-def user_update(data: UserUpdate, token: str = Header(None)):
-    db = SessionLocal()
+def user_update(data: UserUpdate, token: str = Header(None), db: Session = Depends(get_db)):
     try:
         uid = verify_token(token)
         if not uid:
@@ -182,6 +198,7 @@ def user_update(data: UserUpdate, token: str = Header(None)):
         rem = data.showReminder
         user.disable_reminder = (not rem.get('reply')) * 1
         db.commit()
+        invalidate('user')
         return success()
     except Exception as e:
         db.rollback()
@@ -190,33 +207,32 @@ def user_update(data: UserUpdate, token: str = Header(None)):
 
 
 @router.post('/uploadFile')
-async def upload_file(file: UploadFile = File(..., max_size=1024*1024*1024), token: str = Header(None)):
-    db = SessionLocal()
+async def upload_file(file: UploadFile = File(..., max_size=1024*1024*1024), token: str = Header(None), db: Session = Depends(get_db)):
     try:
-        uid = verify_token(token)
+        uid = await verify_token_async(token)
         if not uid:
             return error('NOT_LOGIN')
-        file_url = await save_file(file)
+        file_url, file_hash = await save_file(file, db)
         new_file = UploadedFile(
             url=file_url,
+            hash=file_hash,
             filename=file.filename,
             uid=uid,
             upload_time=time()
         )
         db.add(new_file)
-        db.commit()
+        await run_db(db.commit)
         return success({
             'url': file_url
         })
     except Exception as e:
-        db.rollback()
+        await run_db(db.rollback)
         print(e.args)
         return error()
 
 
 @router.post('/article/submit')
-def article_submit(data: ArticleSubmit, token: str = Header(None)):
-    db = SessionLocal()
+def article_submit(data: ArticleSubmit, token: str = Header(None), db: Session = Depends(get_db)):
     try:
         uid = verify_token(token)
         if not uid:
@@ -232,9 +248,11 @@ def article_submit(data: ArticleSubmit, token: str = Header(None)):
         db.add(new_article)
         db.flush()
         db.refresh(new_article)
-        id = new_article.id
+        sync_submission(db, 0, new_article)
+        enqueue_review(db, 0, new_article.id, uid, data.plainText)
         db.commit()
-        review(data.plainText, 0, id, uid)
+        invalidate('article')
+        review_workers.notify()
         return success()
     except Exception as e:
         db.rollback()
@@ -243,8 +261,7 @@ def article_submit(data: ArticleSubmit, token: str = Header(None)):
 
 
 @router.post('/video/submit')
-def video_submit(data: VideoSubmit, token: str = Header(None)):
-    db = SessionLocal()
+def video_submit(data: VideoSubmit, token: str = Header(None), db: Session = Depends(get_db)):
     try:
         uid = verify_token(token)
         if not uid:
@@ -260,9 +277,10 @@ def video_submit(data: VideoSubmit, token: str = Header(None)):
         db.add(new_video)
         db.flush()
         db.refresh(new_video)
-        id = new_video.id
+        # 视频没有自动审核，保持待审核状态，由管理员在待审核列表中处理
+        sync_submission(db, 1, new_video)
         db.commit()
-        review(data.video, 1, id, uid)
+        invalidate('video')
         return success()
     except Exception as e:
         db.rollback()
@@ -271,55 +289,38 @@ def video_submit(data: VideoSubmit, token: str = Header(None)):
 
 
 @router.post('/user/getSubmission')
-def user_get_submission(data: CommonList, token: str = Header(None)):
-    db = SessionLocal()
+def user_get_submission(data: CommonList, token: str = Header(None), db: Session = Depends(get_db)):
     try:
         uid = data.uid or verify_token(token)
         if not uid:
             return error('NOT_LOGIN')
-        articles = db.query(
-            Article.id,
-            Article.submit_time,
-            Article.title,
-            Article.content,
-            Article.preview,
-            literal(None).label('cover'),
-            literal(None).label('video'),
-            Article.status,
-            Article.desc,
-        ).filter(Article.uid == uid)
-        videos = db.query(
-            Video.id,
-            Video.submit_time,
-            Video.title,
-            literal(None).label('content'),
-            literal(None).label('preview'),
-            Video.cover,
-            Video.video,
-            Video.status,
-            Video.desc,
-        ).filter(Video.uid == uid)
-        combined = articles.union_all(
-            videos).order_by(desc(Article.submit_time))
-        total = db.execute(db.query(func.count()).select_from(
-            combined.subquery())).scalar()
-        result = combined.limit(data.pageSize).offset(
-            (data.pageNum - 1) * data.pageSize).all()
-        db.close()
-        return success({
-            'total': total,
-            'dataList': list(map(lambda obj: {
+        submissions = queries.user_submissions(db, uid)
+        total, capped = count_total(db, submissions, data, ('article', 'video'))
+        result, has_more = fetch_page(
+            paginate(submissions, data, *FEED_KEYS), data.pageSize)
+        details = load_details(db, [(obj.type, obj.id) for obj in result])
+        result_list = []
+        for obj in result:
+            detail = details.get((obj.type, obj.id))
+            result_list.append({
                 'id': obj.id,
                 'submitTime': obj.submit_time,
                 'title': obj.title,
-                'content': obj.content,
-                'preview': obj.preview,
-                'cover': obj.cover,
-                'video': obj.video,
+                'preview': obj.preview if obj.type == 0 else None,
+                'cover': detail.cover if obj.type == 1 else None,
+                'video': detail.video if obj.type == 1 else None,
                 'status': obj.status,
                 'desc': obj.desc,
-            }, result)),
+            })
+        return success({
+            'total': total,
+            'totalCapped': capped,
+            'hasMore': has_more,
+            'cursor': next_cursor(result, has_more, 'submit_time', 'type', 'id'),
+            'dataList': result_list,
         })
+    except InvalidCursor:
+        return error('PARAM_ERROR')
     except Exception as e:
         db.rollback()
         print(e.args)
@@ -327,8 +328,7 @@ def user_get_submission(data: CommonList, token: str = Header(None)):
 
 
 @router.post('/user/delSubmission')
-def user_del_submission(data: CommonId, token: str = Header(None)):
-    db = SessionLocal()
+def user_del_submission(data: CommonId, token: str = Header(None), db: Session = Depends(get_db)):
     try:
         uid = verify_token(token)
         if not uid:
@@ -336,17 +336,32 @@ def user_del_submission(data: CommonId, token: str = Header(None)):
         admin = db.query(User).filter(User.uid == uid).first().admin
         if data.type == 0:
             article_query = db.query(Article).filter(Article.id == data.id)
-            if article_query.first().uid != uid or not admin:
+            article = article_query.first()
+            if article.uid != uid or not admin:
                 return error('NO_PERMISSION')
             article_query.delete()
+            remove_submission(db, 0, data.id)
+            delete_submission(db, 0, data.id)
+            timeline.retract(db, 0, data.id)
+            stats.submission_deleted(db, 0, article.uid, article.status)
+            stats.reply_removed(db, article.uid, db.query(Comment.uid, Comment.time).filter(
+                Comment.type == 0, Comment.submission_id == data.id))
         elif data.type == 1:
             video_query = db.query(Video).filter(Video.id == data.id)
-            if video_query.first().uid != uid or not admin:
+            video = video_query.first()
+            if video.uid != uid or not admin:
                 return error('NO_PERMISSION')
             video_query.delete()
+            remove_submission(db, 1, data.id)
+            delete_submission(db, 1, data.id)
+            timeline.retract(db, 1, data.id)
+            stats.submission_deleted(db, 1, video.uid, video.status)
+            stats.reply_removed(db, video.uid, db.query(Comment.uid, Comment.time).filter(
+                Comment.type == 1, Comment.submission_id == data.id))
         else:
             return error('PARAM_ERROR')
         db.commit()
+        invalidate(SUBMISSION_SCOPES[data.type])
         return success()
     except Exception as e:
         db.rollback()
@@ -355,8 +370,7 @@ def user_del_submission(data: CommonId, token: str = Header(None)):
 
 
 @router.post('/user/updSubmission')
-def user_upd_submission(data: CommonUpd, token: str = Header(None)):
-    db = SessionLocal()
+def user_upd_submission(data: CommonUpd, token: str = Header(None), db: Session = Depends(get_db)):
     try:
         uid = verify_token(token)
         if not uid:
@@ -368,19 +382,38 @@ def user_upd_submission(data: CommonUpd, token: str = Header(None)):
             article = db.query(Article).filter(Article.id == data.id).first()
             if article.uid != uid and not admin:
                 return error('NO_PERMISSION')
+            old_status = article.status
             article.status = data.status
+            stats.submission_status_changed(
+                db, 0, article.uid, old_status, article.status)
             if data.desc != None:
                 article.desc = data.desc
+            sync_submission(db, 0, article)
+            timeline.submission_status_changed(db, 0, article, old_status)
+            if article.status == 1:
+                index_submission(db, 0, article)
+            else:
+                remove_submission(db, 0, article.id)
         elif data.type == 1:
             video = db.query(Video).filter(Video.id == data.id).first()
             if video.uid != uid and not admin:
                 return error('NO_PERMISSION')
+            old_status = video.status
             video.status = data.status
+            stats.submission_status_changed(
+                db, 1, video.uid, old_status, video.status)
             if data.desc != None:
                 video.desc = data.desc
+            sync_submission(db, 1, video)
+            timeline.submission_status_changed(db, 1, video, old_status)
+            if video.status == 1:
+                index_submission(db, 1, video)
+            else:
+                remove_submission(db, 1, video.id)
         else:
             return error('PARAM_ERROR')
         db.commit()
+        invalidate(SUBMISSION_SCOPES[data.type])
         return success()
     except Exception as e:
         db.rollback()
@@ -389,45 +422,39 @@ def user_upd_submission(data: CommonUpd, token: str = Header(None)):
 
 
 @router.post('/user/getCollection')
-def user_get_collection(data: CommonList, token: str = Header(None)):
-    db = SessionLocal()
+def user_get_collection(data: CommonList, token: str = Header(None), db: Session = Depends(get_db)):
     try:
         uid = verify_token(token)
         if not uid:
             return error('NOT_LOGIN')
-        collections = db.query(Collection).filter(
-            Collection.uid == uid).order_by(desc(Collection.time))
-        total = db.execute(db.query(func.count()).select_from(
-            collections.subquery())).scalar()
-        collection_result = collections.limit(data.pageSize).offset(
-            (data.pageNum - 1) * data.pageSize).all()
+        collections = queries.user_collections(db, uid)
+        total, capped = count_total(db, collections, data, ('collection',))
+        collection_result, has_more = fetch_page(paginate(
+            collections, data, Collection.time, Collection.id), data.pageSize)
+        submissions = load_submissions(
+            db, [(collection.type, collection.submission_id) for collection in collection_result])
         result_list = []
         for collection in collection_result:
-            type = collection.type
-            if type == 0:
-                article = db.query(Article).filter(
-                    Article.id == collection.submission_id).first()
-                result_list.append({
-                    'id': collection.id,
-                    'submissionId': article.id,
-                    'title': article.title,
-                    'preview': article.preview,
-                    'time': collection.time,
-                    'type': 0,
-                })
-            elif type == 1:
-                video = db.query(Video).filter(
-                    Video.id == collection.submission_id).first()
-                result_list.append({
-                    'id': collection.id,
-                    'submissionId': video.id,
-                    'title': video.title,
-                    'preview': video.cover,
-                    'time': collection.time,
-                    'type': 1,
-                })
-        db.close()
-        return success({'total': total, 'dataList': result_list})
+            submission = submissions.get(
+                (collection.type, collection.submission_id))
+            result_list.append({
+                'id': collection.id,
+                'submissionId': collection.submission_id,
+                'title': submission.title if submission else None,
+                'preview': submission.preview if submission else '',
+                'time': collection.time,
+                'type': collection.type,
+                'deleted': not submission,
+            })
+        return success({
+            'total': total,
+            'totalCapped': capped,
+            'hasMore': has_more,
+            'cursor': next_cursor(collection_result, has_more, 'time', 'id'),
+            'dataList': result_list,
+        })
+    except InvalidCursor:
+        return error('PARAM_ERROR')
     except Exception as e:
         db.rollback()
         print(e.args)
@@ -435,18 +462,17 @@ def user_get_collection(data: CommonList, token: str = Header(None)):
 
 
 @router.post('/user/delCollection')
-def user_del_collection(data: CommonId, token: str = Header(None)):
-    db = SessionLocal()
+def user_del_collection(data: CommonId, token: str = Header(None), db: Session = Depends(get_db)):
     try:
         uid = verify_token(token)
         if not uid:
             return error('NOT_LOGIN')
-        collection_query = db.query(Collection).filter(
-            Collection.submission_id == data.id, Collection.type == data.type)
+        collection_query = queries.submission_collections(db, data.type, data.id)
         if collection_query.first().uid != uid:
             return error('NO_PERMISSION')
         collection_query.delete()
         db.commit()
+        invalidate('collection')
         return success()
     except Exception as e:
         db.rollback()
@@ -455,15 +481,13 @@ def user_del_collection(data: CommonId, token: str = Header(None)):
 
 
 @router.post('/video/get')
-def video_get(data: CommonId, token: str = Header(None)):
-    db = SessionLocal()
+def video_get(data: CommonId, token: str = Header(None), db: Session = Depends(get_db)):
     try:
         uid = verify_token(token)
         video = db.query(Video).filter(Video.id == data.id).first()
         if not video or video.status != 1:
             return error('NO_SUBMISSION')
         uploader = db.query(User).filter(User.uid == video.uid).first()
-        db.close()
         return success({
             'uploader': {
                 'uid': uploader.uid,
@@ -485,16 +509,19 @@ def video_get(data: CommonId, token: str = Header(None)):
         return error()
 
 
+@router.get('/video/get')
+def video_get_public(request: Request, id: str, db: Session = Depends(get_db)):
+    return cached_response(request, (id,), ('video', 'user'),
+                           lambda: video_get(CommonId(id=id), None, db))
+
+
 @router.post('/user/isFollowed')
-def user_is_followed(data: CommonId, token: str = Header(None)):
-    db = SessionLocal()
+def user_is_followed(data: CommonId, token: str = Header(None), db: Session = Depends(get_db)):
     try:
         uid = verify_token(token)
         if not uid:
             return error('NOT_LOGIN')
-        follow = db.query(Follow).filter(
-            Follow.uid == data.id, Follow.follower_id == uid).first()
-        db.close()
+        follow = queries.follow_relation(db, data.id, uid).first()
         return success({
             'followed': bool(follow)
         })
@@ -505,8 +532,7 @@ def user_is_followed(data: CommonId, token: str = Header(None)):
 
 
 @router.post('/user/follow')
-def user_follow(data: CommonId, token: str = Header(None)):
-    db = SessionLocal()
+def user_follow(data: CommonId, token: str = Header(None), db: Session = Depends(get_db)):
     try:
         uid = verify_token(token)
         if not uid:
@@ -518,7 +544,10 @@ def user_follow(data: CommonId, token: str = Header(None)):
             follower_id=uid,
         )
         db.add(new_follow)
+        stats.follow_changed(db, data.id, 1)
+        timeline.followed(db, data.id, uid)
         db.commit()
+        invalidate('follow')
         return success()
     except Exception as e:
         db.rollback()
@@ -527,15 +556,16 @@ def user_follow(data: CommonId, token: str = Header(None)):
 
 
 @router.post('/user/followCancel')
-def user_follow_cancel(data: CommonId, token: str = Header(None)):
-    db = SessionLocal()
+def user_follow_cancel(data: CommonId, token: str = Header(None), db: Session = Depends(get_db)):
     try:
         uid = verify_token(token)
         if not uid:
             return error('NOT_LOGIN')
-        db.query(Follow).filter(Follow.uid == data.id,
-                                Follow.follower_id == uid).delete()
+        deleted = queries.follow_relation(db, data.id, uid).delete()
+        stats.follow_changed(db, data.id, -deleted)
+        timeline.unfollowed(db, data.id, uid)
         db.commit()
+        invalidate('follow')
         return success()
     except Exception as e:
         db.rollback()
@@ -544,15 +574,12 @@ def user_follow_cancel(data: CommonId, token: str = Header(None)):
 
 
 @router.post('/user/isCollected')
-def user_is_collected(data: CommonId, token: str = Header(None)):
-    db = SessionLocal()
+def user_is_collected(data: CommonId, token: str = Header(None), db: Session = Depends(get_db)):
     try:
         uid = verify_token(token)
         if not uid:
             return error('NOT_LOGIN')
-        collection = db.query(Collection).filter(Collection.type == data.type,
-                                                 Collection.submission_id == data.id, Collection.uid == uid).first()
-        db.close()
+        collection = queries.user_collection(db, uid, data.type, data.id).first()
         return success({
             'collected': bool(collection)
         })
@@ -563,8 +590,7 @@ def user_is_collected(data: CommonId, token: str = Header(None)):
 
 
 @router.post('/user/collect')
-def user_collect(data: CommonId, token: str = Header(None)):
-    db = SessionLocal()
+def user_collect(data: CommonId, token: str = Header(None), db: Session = Depends(get_db)):
     try:
         uid = verify_token(token)
         if not uid:
@@ -577,6 +603,7 @@ def user_collect(data: CommonId, token: str = Header(None)):
         )
         db.add(new_collection)
         db.commit()
+        invalidate('collection')
         return success()
     except Exception as e:
         db.rollback()
@@ -585,15 +612,14 @@ def user_collect(data: CommonId, token: str = Header(None)):
 
 
 @router.post('/user/collectCancel')
-def user_collect_cancel(data: CommonId, token: str = Header(None)):
-    db = SessionLocal()
+def user_collect_cancel(data: CommonId, token: str = Header(None), db: Session = Depends(get_db)):
     try:
         uid = verify_token(token)
         if not uid:
             return error('NOT_LOGIN')
-        db.query(Collection).filter(Collection.type == data.type,
-                                    Collection.uid == uid, Collection.submission_id == data.id).delete()
+        queries.user_collection(db, uid, data.type, data.id).delete()
         db.commit()
+        invalidate('collection')
         return success()
     except Exception as e:
         db.rollback()
@@ -602,22 +628,20 @@ def user_collect_cancel(data: CommonId, token: str = Header(None)):
 
 
 @router.post('/user/getComment')
-def user_get_comment(data: UserGetComment, token: str = Header(None)):
-    db = SessionLocal()
+def user_get_comment(data: UserGetComment, token: str = Header(None), db: Session = Depends(get_db)):
     try:
         uid = verify_token(token)
         admin = False
         if uid:
             admin = bool(db.query(User).filter(User.uid == uid).first().admin)
-        comments = db.query(Comment).filter(Comment.submission_id == data.id,
-                                            Comment.type == data.type).order_by(Comment.time.desc())
-        total = db.execute(db.query(func.count()).select_from(
-            comments.subquery())).scalar()
-        comment_result = comments.limit(data.pageSize).offset(
-            (data.pageNum - 1) * data.pageSize).all()
+        comments = queries.submission_comments(db, data.type, data.id)
+        total, capped = count_total(db, comments, data, ('comment',))
+        comment_result, has_more = fetch_page(paginate(
+            comments, data, Comment.time, Comment.id), data.pageSize)
+        users = load_users(db, [comment.uid for comment in comment_result])
         comment_list = []
         for comment in comment_result:
-            user = db.query(User).filter(User.uid == comment.uid).first()
+            user = users[comment.uid]
             comment_list.append({
                 'id': comment.id,
                 'content': comment.content,
@@ -632,8 +656,15 @@ def user_get_comment(data: UserGetComment, token: str = Header(None)):
                 },
                 'canDelete': uid == comment.uid or admin,
             })
-        db.close()
-        return success({'total': total, 'dataList': comment_list})
+        return success({
+            'total': total,
+            'totalCapped': capped,
+            'hasMore': has_more,
+            'cursor': next_cursor(comment_result, has_more, 'time', 'id'),
+            'dataList': comment_list,
+        })
+    except InvalidCursor:
+        return error('PARAM_ERROR')
     except Exception as e:
         db.rollback()
         print(e.args)
@@ -641,8 +672,7 @@ def user_get_comment(data: UserGetComment, token: str = Header(None)):
 
 
 @router.post('/user/sendComment')
-def user_send_comment(data: UserSendComment, token: str = Header(None)):
-    db = SessionLocal()
+def user_send_comment(data: UserSendComment, token: str = Header(None), db: Session = Depends(get_db)):
     try:
         uid = verify_token(token)
         if not uid:
@@ -655,8 +685,13 @@ def user_send_comment(data: UserSendComment, token: str = Header(None)):
             type=data.type,
         )
         db.add(new_comment)
+        submission = load_submissions(db, [(data.type, data.id)]).get(
+            (data.type, data.id))
+        if submission:
+            stats.reply_added(db, submission.uid, uid)
+        exp_plus(db, uid, 3)
         db.commit()
-        exp_plus(uid, 3)
+        invalidate('comment')
         return success()
     except Exception as e:
         db.rollback()
@@ -665,18 +700,23 @@ def user_send_comment(data: UserSendComment, token: str = Header(None)):
 
 
 @router.post('/user/delComment')
-def user_del_comment(data: CommonId, token: str = Header(None)):
-    db = SessionLocal()
+def user_del_comment(data: CommonId, token: str = Header(None), db: Session = Depends(get_db)):
     try:
         uid = verify_token(token)
         if not uid:
             return error('NOT_LOGIN')
         admin = bool(db.query(User).filter(User.uid == uid).first().admin)
-        comment = db.query(Comment).filter(Comment.id == data.id)
-        if comment.first().uid != uid or not admin:
+        comment_query = db.query(Comment).filter(Comment.id == data.id)
+        comment = comment_query.first()
+        if comment.uid != uid or not admin:
             return error('NO_PERMISSION')
-        comment.delete()
+        comment_query.delete()
+        submission = load_submissions(db, [(comment.type, comment.submission_id)]).get(
+            (comment.type, comment.submission_id))
+        if submission:
+            stats.reply_removed(db, submission.uid, [comment])
         db.commit()
+        invalidate('comment')
         return success()
     except Exception as e:
         db.rollback()
@@ -685,15 +725,14 @@ def user_del_comment(data: CommonId, token: str = Header(None)):
 
 
 @router.post('/article/get')
-def article_get(data: CommonId, token: str = Header(None)):
-    db = SessionLocal()
+def article_get(data: CommonId, token: str = Header(None), db: Session = Depends(get_db)):
     try:
         uid = verify_token(token)
-        article = db.query(Article).filter(Article.id == data.id).first()
+        article = db.query(Article).options(undefer(Article.content)).filter(
+            Article.id == data.id).first()
         if not article or article.status != 1:
             return error('NO_SUBMISSION')
         uploader = db.query(User).filter(User.uid == article.uid).first()
-        db.close()
         return success({
             'uploader': {
                 'uid': uploader.uid,
@@ -714,51 +753,63 @@ def article_get(data: CommonId, token: str = Header(None)):
         return error()
 
 
+@router.get('/article/get')
+def article_get_public(request: Request, id: str, db: Session = Depends(get_db)):
+    return cached_response(request, (id,), ('article', 'user'),
+                           lambda: article_get(CommonId(id=id), None, db))
+
+
+@router.post('/article/getContent')
+def article_get_content(data: CommonId, token: str = Header(None), db: Session = Depends(get_db)):
+    ''' 单独返回文章正文，列表只返回预览。未过审的文章仅作者与管理员可见 '''
+    try:
+        uid = verify_token(token)
+        article = queries.article_content(db, data.id).first()
+        if not article:
+            return error('NO_SUBMISSION')
+        if article.status != 1 and article.uid != uid:
+            admin = uid and db.query(User.admin).filter(User.uid == uid).scalar()
+            if not admin:
+                return error('NO_PERMISSION')
+        return success({'content': article.content})
+    except Exception as e:
+        db.rollback()
+        print(e.args)
+        return error()
+
+
 @router.post('/article/summary')
-def article_summary(data: ArticleSummary):
+async def article_summary(data: ArticleSummary):
     try:
-        return success({'summary': summary(data.title, data.content)})
+        return success({'summary': await summary(data.title, data.content)})
     except Exception as e:
         print(e.args)
         return error()
 
 
 @router.post('/user/getReply')
-def user_get_reply(data: CommonList, token: str = Header(None)):
-    db = SessionLocal()
+def user_get_reply(data: CommonList, token: str = Header(None), db: Session = Depends(get_db)):
     try:
         now = time()
         uid = verify_token(token)
         if not uid:
             return error('NOT_LOGIN')
-        articles = db.query(Article.id).filter(Article.uid == uid)
-        videos = db.query(Video.id).filter(Video.uid == uid)
-        comments = db.query(Comment).filter((((Comment.uid != uid) &
-                                              (Comment.type == 0) & Comment.submission_id.in_(
-                                                  articles)
-                                              ) | (
-            (Comment.type == 1) & Comment.submission_id.in_(videos)
-        ))).order_by(Comment.time.desc())
-        total = db.execute(db.query(func.count()).select_from(
-            comments.subquery())).scalar()
-        comment_result = comments.limit(data.pageSize).offset(
-            (data.pageNum - 1) * data.pageSize).all()
+        comments = queries.user_replies(db, uid)
+        total, capped = count_total(db, comments, data, ('comment', 'article', 'video'))
+        comment_result, has_more = fetch_page(paginate(
+            comments, data, Comment.time, Comment.id), data.pageSize)
+        users = load_users(db, [comment.uid for comment in comment_result])
+        submissions = load_submissions(
+            db, [(comment.type, comment.submission_id) for comment in comment_result])
         reply_list = []
         for comment in comment_result:
-            title = None
-            user = db.query(User).filter(User.uid == comment.uid).first()
-            if comment.type == 0:
-                article = db.query(Article).filter(
-                    Article.id == comment.submission_id).first()
-                title = article.title
-            elif comment.type == 1:
-                video = db.query(Video).filter(
-                    Video.id == comment.submission_id).first()
-                title = video.title
+            user = users[comment.uid]
+            submission = submissions.get(
+                (comment.type, comment.submission_id))
             reply_list.append({
                 'id': comment.id,
                 'submissionId': comment.submission_id,
-                'title': title,
+                'title': submission.title if submission else None,
                 'uid': user.uid,
                 'account': user.account,
                 'nickname': user.nickname,
@@ -768,8 +819,17 @@ def user_get_reply(data: CommonList, token: str = Header(None)):
             })
         user = db.query(User).filter(User.uid == uid).first()
         user.remind_after = now
+        stats.replies_read(db, uid)
         db.commit()
-        return success({'total': total, 'dataList': reply_list})
+        return success({
+            'total': total,
+            'totalCapped': capped,
+            'hasMore': has_more,
+            'cursor': next_cursor(comment_result, has_more, 'time', 'id'),
+            'dataList': reply_list,
+        })
+    except InvalidCursor:
+        return error('PARAM_ERROR')
     except Exception as e:
         db.rollback()
         print(e.args)
@@ -777,23 +837,19 @@ def user_get_reply(data: CommonList, token: str = Header(None)):
 
 
 @router.post('/user/getDetailInfo')
-def user_get_detail_info(data: CommonUid, token: str = Header(None)):
-    db = SessionLocal()
+def user_get_detail_info(data: CommonUid, token: str = Header(None), db: Session = Depends(get_db)):
     try:
         self_id = verify_token(token)
         uid = data.uid or self_id
         if not uid:
             return error('NOT_LOGIN')
-        user = db.query(User).filter(User.uid == uid).first()
-        if not user:
+        row = queries.user_with_stats(db, uid).first()
+        if not row:
             return error('NO_USER')
-        article_total = db.query(Article).filter(
-            Article.uid == uid, Article.status == 1).count()
-        video_total = db.query(Video).filter(
-            Video.uid == uid, Video.status == 1).count()
-        follower_total = db.query(Follow).filter(Follow.uid == uid).count()
-        db.close()
-        return success({
+        user, user_stats = row
+        if not user_stats:
+            user_stats = stats.ensure_stats(db, uid)
+        result = {
             'account': user.account,
             'sex': user.sex,
             'nickname': user.nickname,
@@ -801,11 +857,13 @@ def user_get_detail_info(data: CommonUid, token: str = Header(None)):
             'desc': user.desc,
             'exp': user.exp,
             'signupTime': user.signup_time,
-            'articleTotal': article_total,
-            'videoTotal': video_total,
-            'followerTotal': follower_total,
+            'articleTotal': user_stats.article_total,
+            'videoTotal': user_stats.video_total,
+            'followerTotal': user_stats.follower_total,
             'canFollow': user.uid != self_id,
-        })
+        }
+        db.commit()
+        return success(result)
     except Exception as e:
         db.rollback()
         print(e.args)
@@ -813,45 +871,30 @@ def user_get_detail_info(data: CommonUid, token: str = Header(None)):
 
 
 @router.post('/user/getSubmissionPreview')
-def user_get_submission(data: CommonList, token: str = Header(None)):
-    db = SessionLocal()
+def user_get_submission(data: CommonList, token: str = Header(None), db: Session = Depends(get_db)):
     try:
         uid = data.uid or verify_token(token)
         if not uid:
             return error('NOT_LOGIN')
-        articles = db.query(
-            Article.id,
-            Article.submit_time,
-            Article.title,
-            Article.preview,
-            literal(None).label('cover'),
-            literal(0).label('type'),
-        ).filter(Article.uid == uid, Article.status == 1)
-        videos = db.query(
-            Video.id,
-            Video.submit_time,
-            Video.title,
-            literal(None).label('preview'),
-            Video.cover,
-            literal(1).label('type')
-        ).filter(Video.uid == uid, Video.status == 1)
-        combined = articles.union_all(
-            videos).order_by(desc(Article.submit_time))
-        total = db.execute(db.query(func.count()).select_from(
-            combined.subquery())).scalar()
-        result = combined.limit(data.pageSize).offset(
-            (data.pageNum - 1) * data.pageSize).all()
-        db.close()
+        submissions = queries.user_submissions(db, uid, published=True)
+        total, capped = count_total(db, submissions, data, ('article', 'video'))
+        result, has_more = fetch_page(
+            paginate(submissions, data, *FEED_KEYS), data.pageSize)
         return success({
             'total': total,
+            'totalCapped': capped,
+            'hasMore': has_more,
+            'cursor': next_cursor(result, has_more, 'submit_time', 'type', 'id'),
             'dataList': list(map(lambda obj: {
                 'id': obj.id,
                 'submitTime': obj.submit_time,
                 'title': obj.title,
-                'preview': obj.preview or obj.cover,
+                'preview': obj.preview,
                 'type': obj.type,
             }, result)),
         })
+    except InvalidCursor:
+        return error('PARAM_ERROR')
     except Exception as e:
         db.rollback()
         print(e.args)
@@ -859,18 +902,16 @@ def user_get_submission(data: CommonList, token: str = Header(None)):
 
 
 @router.post('/article/getAll')
-def article_get_all(data: CommonList):
-    db = SessionLocal()
+def article_get_all(data: CommonList, db: Session = Depends(get_db)):
     try:
-        articles = db.query(Article).filter(
-            Article.status == 1).order_by(desc(Article.submit_time))
-        total = db.execute(db.query(func.count()).select_from(
-            articles.subquery())).scalar()
-        result = articles.limit(data.pageSize).offset(
-            (data.pageNum - 1) * data.pageSize).all()
+        articles = queries.public_articles(db)
+        total, capped = count_total(db, articles, data, ('article',))
+        result, has_more = fetch_page(
+            paginate(articles, data, Article.submit_time, Article.id), data.pageSize)
+        users = load_users(db, [article.uid for article in result])
         result_list = []
         for article in result:
-            user = db.query(User).filter(User.uid == article.uid).first()
+            user = users[article.uid]
             result_list.append({
                 'id': article.id,
                 'submitTime': article.submit_time,
@@ -879,27 +920,42 @@ def article_get_all(data: CommonList):
                 'uploaderAccount': user.account,
                 'uploaderNickname': user.nickname,
             })
-        db.close()
-        return success({'total': total, 'dataList': result_list})
+        return success({
+            'total': total,
+            'totalCapped': capped,
+            'hasMore': has_more,
+            'cursor': next_cursor(result, has_more, 'submit_time', 'id'),
+            'dataList': result_list,
+        })
+    except InvalidCursor:
+        return error('PARAM_ERROR')
     except Exception as e:
         db.rollback()
         print(e.args)
         return error()
 
 
+@router.get('/article/getAll')
+def article_get_all_public(request: Request, pageSize: int, pageNum: int = 1,
+                           cursor: Optional[str] = None, withTotal: bool = True,
+                           db: Session = Depends(get_db)):
+    data = CommonList(pageNum=pageNum, pageSize=pageSize,
+                      cursor=cursor, withTotal=withTotal)
+    return cached_response(request, (pageNum, pageSize, cursor, withTotal), ('article', 'user'),
+                           lambda: article_get_all(data, db))
+
+
 @router.post('/video/getAll')
-def video_get_all(data: CommonList):
-    db = SessionLocal()
+def video_get_all(data: CommonList, db: Session = Depends(get_db)):
     try:
-        videos = db.query(Video).filter(
-            Video.status == 1).order_by(desc(Video.submit_time))
-        total = db.execute(db.query(func.count()).select_from(
-            videos.subquery())).scalar()
-        result = videos.limit(data.pageSize).offset(
-            (data.pageNum - 1) * data.pageSize).all()
+        videos = queries.public_videos(db)
+        total, capped = count_total(db, videos, data, ('video',))
+        result, has_more = fetch_page(
+            paginate(videos, data, Video.submit_time, Video.id), data.pageSize)
+        users = load_users(db, [video.uid for video in result])
         result_list = []
         for video in result:
-            user = db.query(User).filter(User.uid == video.uid).first()
+            user = users[video.uid]
             result_list.append({
                 'id': video.id,
                 'submitTime': video.submit_time,
@@ -908,68 +964,62 @@ def video_get_all(data: CommonList):
                 'uploaderAccount': user.account,
                 'uploaderNickname': user.nickname,
             })
-        db.close()
-        return success({'total': total, 'dataList': result_list})
+        return success({
+            'total': total,
+            'totalCapped': capped,
+            'hasMore': has_more,
+            'cursor': next_cursor(result, has_more, 'submit_time', 'id'),
+            'dataList': result_list,
+        })
+    except InvalidCursor:
+        return error('PARAM_ERROR')
     except Exception as e:
         db.rollback()
         print(e.args)
         return error()
 
 
+@router.get('/video/getAll')
+def video_get_all_public(request: Request, pageSize: int, pageNum: int = 1,
+                         cursor: Optional[str] = None, withTotal: bool = True,
+                         db: Session = Depends(get_db)):
+    data = CommonList(pageNum=pageNum, pageSize=pageSize,
+                      cursor=cursor, withTotal=withTotal)
+    return cached_response(request, (pageNum, pageSize, cursor, withTotal), ('video', 'user'),
+                           lambda: video_get_all(data, db))
+
+
 @router.post('/common/search')
-def common_search(data: CommonSearch):
-    db = SessionLocal()
+def common_search(data: CommonSearch, db: Session = Depends(get_db)):
     try:
-        keywords = [kw.strip() for kw in data.content.split() if kw.strip()]
-        if not keywords:
-            return success({'total': 0, 'dataList': []})
-        conditions = []
-        for keyword in keywords:
-            search_term = f"%{keyword}%"
-            conditions.append(Article.title.ilike(search_term))
-            conditions.append(Article.content.ilike(search_term))
-        articles = db.query(
-            Article.id,
-            Article.uid,
-            Article.submit_time,
-            Article.title,
-            Article.preview,
-            literal(None).label('cover'),
-            literal(0).label('type'),
-        ).filter(Article.status == 1, or_(*conditions))
-        conditions = []
-        for keyword in keywords:
-            search_term = f"%{keyword}%"
-            conditions.append(Video.title.ilike(search_term))
-        videos = db.query(
-            Video.id,
-            Video.uid,
-            Video.submit_time,
-            Video.title,
-            literal(None).label('preview'),
-            Video.cover,
-            literal(1).label('type'),
-        ).filter(Video.status == 1, or_(*conditions))
-        combined = articles.union_all(
-            videos).order_by(desc(Article.submit_time))
-        total = db.execute(db.query(func.count()).select_from(
-            combined.subquery())).scalar()
-        result = combined.limit(data.pageSize).offset(
-            (data.pageNum - 1) * data.pageSize).all()
+        total, capped, hits, has_more = search(db, data)
+        rows = load_submissions(
+            db, [(hit.type, hit.submission_id) for hit in hits], status=1)
+        users = load_users(db, [obj.uid for obj in rows.values()])
         result_list = []
-        for obj in result:
-            user = db.query(User).filter(User.uid == obj.uid).first()
+        for hit in hits:
+            obj = rows.get((hit.type, hit.submission_id))
+            if not obj:
+                continue
+            user = users[obj.uid]
             result_list.append({
                 'id': obj.id,
                 'submitTime': obj.submit_time,
                 'title': obj.title,
-                'preview': obj.preview or obj.cover,
-                'type': obj.type,
+                'preview': obj.preview,
+                'type': hit.type,
                 'uploaderAccount': user.account,
                 'uploaderNickname': user.nickname,
             })
-        db.close()
-        return success({'total': total, 'dataList': result_list})
+        return success({
+            'total': total,
+            'totalCapped': capped,
+            'hasMore': has_more,
+            'cursor': next_cursor(hits, has_more, 'matched', 'score', 'submit_time', 'type', 'submission_id'),
+            'dataList': result_list,
+        })
+    except InvalidCursor:
+        return error('PARAM_ERROR')
     except Exception as e:
         db.rollback()
         print(e.args)
@@ -977,20 +1027,19 @@ def common_search(data: CommonSearch):
 
 
 @router.post('/user/getFollowed')
-def user_get_followed(data: CommonList, token: str = Header(None)):
-    db = SessionLocal()
+def user_get_followed(data: CommonList, token: str = Header(None), db: Session = Depends(get_db)):
     try:
         uid = verify_token(token)
         if not uid:
             return error('NOT_LOGIN')
-        follows = db.query(Follow).filter(Follow.follower_id == uid)
-        total = db.execute(db.query(func.count()).select_from(
-            follows.subquery())).scalar()
-        result = follows.limit(data.pageSize).offset(
-            (data.pageNum - 1) * data.pageSize).all()
+        follows = queries.user_follows(db, uid)
+        total, capped = count_total(db, follows, data, ('follow',))
+        result, has_more = fetch_page(
+            paginate(follows, data, Follow.id, reverse=True), data.pageSize)
+        users = load_users(db, [follow.uid for follow in result])
         result_list = []
         for follow in result:
-            user = db.query(User).filter(User.uid == follow.uid).first()
+            user = users[follow.uid]
             result_list.append({
                 'uid': user.uid,
                 'account': user.account,
@@ -1000,8 +1049,15 @@ def user_get_followed(data: CommonList, token: str = Header(None)):
                 'desc': user.desc,
                 'exp': user.exp,
             })
-        db.close()
-        return success({'total': total, 'dataList': result_list})
+        return success({
+            'total': total,
+            'totalCapped': capped,
+            'hasMore': has_more,
+            'cursor': next_cursor(result, has_more, 'id'),
+            'dataList': result_list,
+        })
+    except InvalidCursor:
+        return error('PARAM_ERROR')
     except Exception as e:
         db.rollback()
         print(e.args)
@@ -1009,51 +1065,34 @@ def user_get_followed(data: CommonList, token: str = Header(None)):
 
 
 @router.post('/user/getFollowedSubmission')
-def user_get_followed_submission(data: CommonList, token: str = Header(None)):
-    db = SessionLocal()
+def user_get_followed_submission(data: CommonList, token: str = Header(None), db: Session = Depends(get_db)):
     try:
         uid = verify_token(token)
         if not uid:
             return error('NOT_LOGIN')
-        follows = db.query(Follow.uid).filter(Follow.follower_id == uid)
-        articles = db.query(
-            Article.id,
-            Article.uid,
-            Article.submit_time,
-            Article.title,
-            Article.preview,
-            literal(None).label('cover'),
-            literal(0).label('type'),
-        ).filter(Article.status == 1, Article.uid.in_(follows))
-        videos = db.query(
-            Video.id,
-            Video.uid,
-            Video.submit_time,
-            Video.title,
-            literal(None).label('preview'),
-            Video.cover,
-            literal(1).label('type'),
-        ).filter(Video.status == 1, Video.uid.in_(follows))
-        combined = articles.union_all(
-            videos).order_by(desc(Article.submit_time))
-        total = db.execute(db.query(func.count()).select_from(
-            combined.subquery())).scalar()
-        result = combined.limit(data.pageSize).offset(
-            (data.pageNum - 1) * data.pageSize).all()
+        result, has_more, total, capped = timeline.followed_feed(db, uid, data)
+        users = load_users(db, [obj.uid for obj in result])
         result_list = []
         for obj in result:
-            user = db.query(User).filter(User.uid == obj.uid).first()
+            user = users[obj.uid]
             result_list.append({
                 'id': obj.id,
                 'submitTime': obj.submit_time,
                 'title': obj.title,
-                'preview': obj.preview or obj.cover,
+                'preview': obj.preview,
                 'type': obj.type,
                 'uploaderAccount': user.account,
                 'uploaderNickname': user.nickname,
             })
-        db.close()
-        return success({'total': total, 'dataList': result_list})
+        return success({
+            'total': total,
+            'totalCapped': capped,
+            'hasMore': has_more,
+            'cursor': next_cursor(result, has_more, 'submit_time', 'type', 'id'),
+            'dataList': result_list,
+        })
+    except InvalidCursor:
+        return error('PARAM_ERROR')
     except Exception as e:
         db.rollback()
         print(e.args)
@@ -1061,14 +1100,12 @@ def user_get_followed_submission(data: CommonList, token: str = Header(None)):
 
 
 @router.post('/user/isAdmin')
-def user_is_admin(token: str = Header(token)):
-    db = SessionLocal()
+def user_is_admin(token: str = Header(token), db: Session = Depends(get_db)):
     try:
         uid = verify_token(token)
         if not uid:
             return error('NOT_LOGIN')
         admin = db.query(User.admin).filter(User.uid == uid).first().admin
-        db.close()
         return success({'isAdmin': admin})
     except Exception as e:
         db.rollback()
@@ -1077,8 +1114,7 @@ def user_is_admin(token: str = Header(token)):
 
 
 @router.post('/user/getSubmissionNeedReview')
-def user_get_submission_need_review(data: CommonList, token: str = Header(token)):
-    db = SessionLocal()
+def user_get_submission_need_review(data: CommonList, token: str = Header(token), db: Session = Depends(get_db)):
     try:
         uid = verify_token(token)
         if not uid:
@@ -1086,49 +1122,33 @@ def user_get_submission_need_review(data: CommonList, token: str = Header(token)
         admin = db.query(User.admin).filter(User.uid == uid).first().admin
         if not admin:
             return error('NO_PERMISSION')
-        articles = db.query(
-            Article.id,
-            Article.submit_time,
-            Article.title,
-            Article.content,
-            Article.preview,
-            literal(None).label('cover'),
-            literal(None).label('video'),
-            Article.status,
-            Article.desc,
-        ).filter((Article.status == 0) | (Article.status == 3))
-        videos = db.query(
-            Video.id,
-            Video.submit_time,
-            Video.title,
-            literal(None).label('content'),
-            literal(None).label('preview'),
-            Video.cover,
-            Video.video,
-            Video.status,
-            Video.desc,
-        ).filter((Video.status == 0) | (Video.status == 3))
-        combined = articles.union_all(
-            videos).order_by(desc(Article.submit_time))
-        total = db.execute(db.query(func.count()).select_from(
-            combined.subquery())).scalar()
-        result = combined.limit(data.pageSize).offset(
-            (data.pageNum - 1) * data.pageSize).all()
-        db.close()
-        return success({
-            'total': total,
-            'dataList': list(map(lambda obj: {
+        submissions = queries.submissions_need_review(db)
+        total, capped = count_total(db, submissions, data, ('article', 'video'))
+        result, has_more = fetch_page(
+            paginate(submissions, data, *FEED_KEYS), data.pageSize)
+        details = load_details(db, [(obj.type, obj.id) for obj in result])
+        result_list = []
+        for obj in result:
+            detail = details.get((obj.type, obj.id))
+            result_list.append({
                 'id': obj.id,
                 'submitTime': obj.submit_time,
                 'title': obj.title,
-                'content': obj.content,
-                'preview': obj.preview,
-                'cover': obj.cover,
-                'video': obj.video,
+                'preview': obj.preview if obj.type == 0 else None,
+                'cover': detail.cover if obj.type == 1 else None,
+                'video': detail.video if obj.type == 1 else None,
                 'status': obj.status,
                 'desc': obj.desc,
-            }, result)),
+            })
+        return success({
+            'total': total,
+            'totalCapped': capped,
+            'hasMore': has_more,
+            'cursor': next_cursor(result, has_more, 'submit_time', 'type', 'id'),
+            'dataList': result_list,
         })
+    except InvalidCursor:
+        return error('PARAM_ERROR')
     except Exception as e:
         db.rollback()
         print(e.args)
@@ -1136,9 +1156,30 @@ def user_get_submission_need_review(data: CommonList, token: str = Header(token)
 
 
 @router.post('/common/imageProcessing')
-def image_processing(data: CommonImageProcessing):
+async def image_processing(data: CommonImageProcessing):
     try:
-        return success({'image': ai_image_procssing(data.image, data.api)})
+        return success({'image': await ai_image_procssing(data.image, data.api)})
     except Exception as e:
         print(e.args)
         return error()
+
+
+@internal_router.get('/metrics')
+async def internal_metrics(request: Request):
+    ''' 连接池与后台组件的运行状态，用于观察连接池是否饱和，只允许本机直接访问，经过代理转发的请求一律拒绝 '''
+    if not request.client or request.client.host not in INTERNAL_HOSTS:
+        return error('NO_PERMISSION')
+    if any(header in request.headers for header in FORWARDED_HEADERS):
+        return error('NO_PERMISSION')
+    pools = {'sync': pool_monitor.snapshot(engine.pool)}
+    if async_engine is not None:
+        pools['async'] = async_pool_monitor.snapshot(async_engine.sync_engine.pool)
+    return success({
+        'pools': pools,
+        'baiduToken': token_manager.health(),
+        'mail': {
+            'sent': mail_dispatcher.sent,
+            'failed': mail_dispatcher.failed,
+            'queued': mail_dispatcher.queued(),
+        },
+    })
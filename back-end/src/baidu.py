@@ -0,0 +1,236 @@
+import json
+import asyncio
+import threading
+import time as _time
+import httpx
+from starlette.concurrency import run_in_threadpool
+from . import utils
+from .config import get_config, peek_config
+
+TOKEN_URL = 'https://aip.baidubce.com/oauth/2.0/token'
+TEXT_CENSOR = 'https://aip.baidubce.com/rest/2.0/solution/v1/text_censor/v2/user_defined'
+VIDEO_CENSOR = 'https://aip.baidubce.com/rest/2.0/solution/v1/video_censor/v1/video/submit'
+NEWS_SUMMARY = 'https://aip.baidubce.com/rpc/2.0/nlp/v1/news_summary'
+IMAGE_APIS = {
+    'coloring': 'https://aip.baidubce.com/rest/2.0/image-process/v1/colourize',
+    'animization': 'https://aip.baidubce.com/rest/2.0/image-process/v1/selfie_anime',
+    'defogging': 'https://aip.baidubce.com/rest/2.0/image-process/v1/dehaze',
+    'contrast': 'https://aip.baidubce.com/rest/2.0/image-process/v1/contrast_enhance',
+    'scale': 'https://aip.baidubce.com/rest/2.0/image-process/v1/image_quality_enhance',
+    'restore': 'https://aip.baidubce.com/rest/2.0/image-process/v1/stretch_restore',
+    'definition': 'https://aip.baidubce.com/rest/2.0/image-process/v1/image_definition_enhance',
+    'colorEnhance': 'https://aip.baidubce.com/rest/2.0/image-process/v1/color_enhance',
+}
+
+# 各接口的超时时间（秒）与最大并发数
+API_LIMITS = {
+    'token': (5, 2),
+    'text_censor': (10, 4),
+    'news_summary': (15, 4),
+    'image': (30, 4),
+}
+POOL_LIMITS = httpx.Limits(max_connections=32, max_keepalive_connections=16,
+                           keepalive_expiry=60)
+
+_sync_client = None
+_async_client = None
+_client_lock = threading.Lock()
+_sync_semaphores = {name: threading.BoundedSemaphore(limit)
+                    for name, (_, limit) in API_LIMITS.items()}
+_async_semaphores = {name: asyncio.Semaphore(limit)
+                     for name, (_, limit) in API_LIMITS.items()}
+
+
+def _get_sync_client():
+    global _sync_client
+    with _client_lock:
+        if _sync_client is None:
+            _sync_client = httpx.Client(limits=POOL_LIMITS)
+        return _sync_client
+
+
+def _get_async_client():
+    global _async_client
+    if _async_client is None:
+        _async_client = httpx.AsyncClient(limits=POOL_LIMITS)
+    return _async_client
+
+
+def request(name: str, url: str, **kwargs):
+    ''' 使用共享的连接池同步发送POST请求，供后台线程使用 '''
+    timeout, _ = API_LIMITS[name]
+    with _sync_semaphores[name]:
+        response = _get_sync_client().post(url, timeout=timeout, **kwargs)
+    return response.json()
+
+
+async def request_async(name: str, url: str, **kwargs):
+    ''' 使用共享的连接池异步发送POST请求 '''
+    timeout, _ = API_LIMITS[name]
+    async with _async_semaphores[name]:
+        response = await _get_async_client().post(url, timeout=timeout, **kwargs)
+    return response.json()
+
+
+async def aclose():
+    global _sync_client, _async_client
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
+    with _client_lock:
+        if _sync_client is not None:
+            _sync_client.close()
+            _sync_client = None
+
+
+def _credentials():
+    config = get_config()
+    return config.api_key, config.secret_key
+
+
+def _peek_credentials():
+    config = peek_config()
+    return (config.api_key, config.secret_key) if config else None
+
+
+def _fetch_token(credentials):
+    api_key, secret_key = credentials
+    result = request('token', TOKEN_URL, data={
+        'grant_type': 'client_credentials',
+        'client_id': api_key,
+        'client_secret': secret_key
+    })
+    if ('access_token' in result.keys() and 'scope' in result.keys()):
+        if not 'brain_all_scope' in result['scope'].split(' '):
+            raise RuntimeError('please ensure has check the ability')
+        return result['access_token'], result.get('expires_in', 30 * 24 * 60 * 60)
+    else:
+        raise RuntimeError('please overwrite the correct API_KEY and SECRET_KEY')
+
+
+class TokenManager:
+    '''
+    百度接口access_token管理：首次使用时才获取，剩余有效期不足REFRESH_AHEAD比例时在后台刷新，
+    并发调用方共享同一次刷新，获取失败后RETRY_INTERVAL秒内不再重试，更换密钥后重新获取
+    '''
+    REFRESH_AHEAD = 0.1
+    RETRY_INTERVAL = 5
+
+    def __init__(self, fetch=_fetch_token, credentials=_credentials, peek=_peek_credentials):
+        self._fetch = fetch
+        self._credentials = credentials
+        self._peek = peek
+        self._token = None
+        self._token_credentials = None
+        self._expire_at = 0
+        self._refresh_at = 0
+        self._retry_at = 0
+        self._lock = threading.Lock()
+        self._flag_lock = threading.Lock()
+        self._refreshing = False
+        self.last_error = None
+        self.last_refresh = None
+        self.failures = 0
+
+    def _refresh(self):
+        now = _time.monotonic()
+        if now < self._retry_at:
+            return
+        try:
+            credentials = self._credentials()
+            token, expires_in = self._fetch(credentials)
+        except Exception as e:
+            print(e.args)
+            self.last_error = str(e.args)
+            self.failures += 1
+            self._retry_at = now + self.RETRY_INTERVAL
+            return
+        self._token = token
+        self._token_credentials = credentials
+        self._expire_at = now + expires_in
+        self._refresh_at = self._expire_at - expires_in * self.REFRESH_AHEAD
+        self.last_error = None
+        self.last_refresh = utils.time()
+        self.failures = 0
+
+    def _refresh_in_background(self):
+        def run():
+            try:
+                with self._lock:
+                    if _time.monotonic() >= self._refresh_at:
+                        self._refresh()
+            finally:
+                self._refreshing = False
+
+        with self._flag_lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        threading.Thread(target=run, name='baidu-token-refresh',
+                         daemon=True).start()
+
+    def _cached(self, credentials):
+        now = _time.monotonic()
+        if credentials is None or self._token_credentials != credentials:
+            return None
+        if self._token and now < self._expire_at:
+            if now >= self._refresh_at:
+                self._refresh_in_background()
+            return self._token
+        return None
+
+    def get(self):
+        token = self._cached(self._credentials())
+        if token:
+            return token
+        with self._lock:
+            token = self._cached(self._credentials())
+            if not token:
+                self._refresh()
+                token = self._cached(self._credentials())
+        if not token:
+            raise RuntimeError('BAIDU_TOKEN_UNAVAILABLE', self.last_error)
+        return token
+
+    async def aget(self):
+        # 事件循环中只比较内存中的配置，需要重新加载配置或获取token时才进入线程池
+        return self._cached(self._peek()) or await run_in_threadpool(self.get)
+
+    def health(self):
+        remaining = self._expire_at - _time.monotonic() if self._token else 0
+        return {
+            'ready': remaining > 0,
+            'expiresIn': max(int(remaining), 0),
+            'lastRefresh': self.last_refresh,
+            'lastError': self.last_error,
+            'failures': self.failures,
+        }
+
+
+token_manager = TokenManager()
+
+
+def text_censor(text: str):
+    return request('text_censor', TEXT_CENSOR, params={'access_token': token_manager.get()},
+                   data={'text': text})
+
+
+async def summary(title: str, content: str, max_summary_len=200):
+    result = await request_async('news_summary', NEWS_SUMMARY, params={
+        'charset': 'UTF-8',
+        'access_token': await token_manager.aget(),
+    }, content=json.dumps({
+        'title': title,
+        'content': content,
+        'max_summary_len': max_summary_len,
+    }), headers={'Content-Type': 'application/json'})
+    print(result)
+    return result['summary']
+
+
+async def ai_image_procssing(image: str, api: str):
+    result = await request_async('image', IMAGE_APIS[api], params={'access_token': await token_manager.aget()},
+                                 data={'image': image})
+    if 'image' not in result:
+        print(result)
+    return result['image']
@@ -0,0 +1,111 @@
+import asyncio
+import threading
+import time as _time
+from collections import OrderedDict
+
+
+class TTLCache:
+    '''
+    线程安全的LRU缓存，超过maxsize时淘汰最久未使用的条目，条目写入ttl秒后失效。
+    给出maxbytes时还按sizeof(value)之和限制总大小
+    '''
+
+    def __init__(self, maxsize=10000, ttl=None, maxbytes=None, sizeof=len):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.maxbytes = maxbytes
+        self.sizeof = sizeof
+        self.nbytes = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _size(self, value):
+        return self.sizeof(value) if self.maxbytes is not None else 0
+
+    def _remove(self, key):
+        value, _ = self._data.pop(key)
+        self.nbytes -= self._size(value)
+        return value
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            value, expire = item
+            if expire is not None and expire < _time.monotonic():
+                self._remove(key)
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        expire = _time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            self._data[key] = (value, expire)
+            self.nbytes += self._size(value)
+            while len(self._data) > self.maxsize or (
+                    self.maxbytes is not None and self.nbytes > self.maxbytes and len(self._data) > 1):
+                self._remove(next(iter(self._data)))
+
+    def pop(self, key, default=None):
+        with self._lock:
+            return self._remove(key) if key in self._data else default
+
+    def discard_if(self, predicate):
+        ''' 删除所有满足predicate(key, value)的条目 '''
+        with self._lock:
+            for key in [key for key, (value, _) in self._data.items() if predicate(key, value)]:
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.nbytes = 0
+
+    def __len__(self):
+        return len(self._data)
+
+
+class ScopeVersions:
+    '''
+    按范围（通常为表名）记录的数据版本号，写入提交后递增。
+    缓存条目保存生成时的版本号，读取时与当前版本号不一致即视为失效
+    '''
+
+    def __init__(self):
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def bump(self, *scopes):
+        with self._lock:
+            for scope in scopes:
+                self._versions[scope] = self._versions.get(scope, 0) + 1
+
+    def snapshot(self, scopes):
+        return tuple(self._versions.get(scope, 0) for scope in scopes)
+
+
+data_versions = ScopeVersions()
+
+
+def invalidate(*scopes):
+    ''' 写入提交后调用，使依赖这些范围的总数缓存与响应缓存失效 '''
+    data_versions.bump(*scopes)
+
+
+class SingleFlight:
+    ''' 合并相同key的并发异步调用：执行期间的重复调用共享同一个结果或异常 '''
+
+    def __init__(self):
+        self._calls = {}
+
+    async def do(self, key, func):
+        future = self._calls.get(key)
+        if future is None:
+            future = asyncio.ensure_future(func())
+            self._calls[key] = future
+            future.add_done_callback(lambda _: self._calls.pop(key, None))
+        return await asyncio.shield(future)
@@ -0,0 +1,48 @@
+import json
+import hashlib
+from fastapi import Request, Response
+from .cache import TTLCache, data_versions
+
+RESPONSE_TTL = 60
+# 浏览器与中间缓存的有效期，服务端的失效无法通知到它们，因此取较短的时间
+MAX_AGE = 10
+CACHE_CONTROL = f'public, max-age={MAX_AGE}, stale-while-revalidate={MAX_AGE * 3}'
+
+# 按响应体的总字节数限制缓存，超过MAX_BODY的响应（通常是大篇文章）不缓存
+MAX_BYTES = 32 * 1024 * 1024
+MAX_BODY = 256 * 1024
+
+_responses = TTLCache(maxsize=2048, ttl=RESPONSE_TTL, maxbytes=MAX_BYTES,
+                      sizeof=lambda entry: len(entry[1]))
+
+
+def _etag_matches(header: str, etag: str):
+    if not header:
+        return False
+    tags = [tag.strip().removeprefix('W/') for tag in header.split(',')]
+    return '*' in tags or etag in tags
+
+
+def cached_response(request: Request, params: tuple, scopes, build):
+    '''
+    供匿名访问的公开只读接口的GET响应：响应体按路径与接口声明的参数params缓存（其余查询参数不影响缓存），
+    scopes中的数据有写入时失效。返回强ETag与Cache-Control，If-None-Match命中时返回304。
+    build返回success()/error()的结果，失败的结果不缓存
+    '''
+    key = (request.url.path, params)
+    versions = data_versions.snapshot(scopes)
+    entry = _responses.get(key)
+    if not entry or entry[0] != versions:
+        result = build()
+        body = json.dumps(result, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        if not result['success']:
+            return Response(body, media_type='application/json',
+                            headers={'Cache-Control': 'no-store'})
+        entry = (versions, body, f'"{hashlib.sha256(body).hexdigest()[:32]}"')
+        if len(body) <= MAX_BODY:
+            _responses.set(key, entry)
+    _, body, etag = entry
+    headers = {'ETag': etag, 'Cache-Control': CACHE_CONTROL}
+    if _etag_matches(request.headers.get('if-none-match'), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type='application/json', headers=headers)
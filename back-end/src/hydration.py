@@ -0,0 +1,64 @@
+from sqlalchemy import or_
+from .models import User, Video, Submission
+
+
+def load_users(db, uids):
+    '''
+    收集一页数据中的uid，用一次IN查询批量加载用户公开信息，返回{uid: 用户}，
+    避免在循环中逐行查询用户
+    '''
+    uids = {uid for uid in uids if uid}
+    if not uids:
+        return {}
+    users = db.query(
+        User.uid,
+        User.account,
+        User.nickname,
+        User.sex,
+        User.avatar,
+        User.desc,
+        User.exp,
+    ).filter(User.uid.in_(uids)).all()
+    return {user.uid: user for user in users}
+
+
+def load_submissions(db, keys, status=None):
+    '''
+    用一次查询从submission表批量加载投稿，keys为[(type, id)]，可按status过滤。
+    返回{(type, id): 投稿}，视频的封面作为preview返回；已删除的投稿不在结果中
+    '''
+    ids = {0: set(), 1: set()}
+    for type, id in keys:
+        if type in ids and id:
+            ids[type].add(id)
+    if not ids[0] and not ids[1]:
+        return {}
+    query = submissions_query(db, ids)
+    if status is not None:
+        query = query.filter(Submission.status == status)
+    return {(obj.type, obj.id): obj for obj in query}
+
+
+def submissions_query(db, ids):
+    ''' ids为{type: id的集合} '''
+    return db.query(
+        Submission.id,
+        Submission.type,
+        Submission.uid,
+        Submission.submit_time,
+        Submission.title,
+        Submission.preview,
+    ).filter(or_(*[(Submission.type == type) & Submission.id.in_(type_ids)
+                   for type, type_ids in ids.items() if type_ids]))
+
+
+def load_details(db, keys):
+    '''
+    批量加载列表需要而submission表中没有的列（视频封面与地址），keys为[(type, id)]，
+    返回{(type, id): 投稿}。文章正文不在列表中返回，由/article/getContent按需加载
+    '''
+    ids = {id for type, id in keys if type == 1}
+    if not ids:
+        return {}
+    videos = db.query(Video.id, Video.cover, Video.video).filter(Video.id.in_(ids))
+    return {(1, obj.id): obj for obj in videos}
@@ -0,0 +1,168 @@
+import queue
+import smtplib
+import threading
+from string import Template
+from email.mime.text import MIMEText
+from email.mime.multipart import MIMEMultipart
+from .config import get_config
+
+MAIL_WORKERS = 2
+MAX_ATTEMPTS = 3
+IDLE_TIMEOUT = 60
+SENDER_NAME = 'Egaku@egaku.com'
+
+_CODE_PAGE = Template('''
+    <!DOCTYPE html>
+    <html lang="$lang">
+    <head>
+        <meta charset="UTF-8">
+        <meta name="viewport" content="width=device-width, initial-scale=1.0">
+        <title>Egaku</title>
+    </head>
+    <body>
+        <h3>Egaku</h3>
+        <p>$intro</p>
+        <h1>$${code}</h1>
+        <p>$notice</p>
+        <p>$thanks</p>
+    </body>
+    </html>
+''')
+
+_CODE_TEXTS = {
+    'zh-Hans': ('验证码', '您的验证码是：', '有效时间为<b>5分钟</b>。请勿将其泄露给他人。如果您未进行过相关操作，请忽略。', '谢谢！'),
+    'zh-Hant': ('驗證碼', '您的驗證碼是：', '有效時間為<b>5分鐘</b>。請勿將其洩露給他人。如果您未進行過相關操作，請忽略。', '謝謝！'),
+    'ja': ('認証コード', 'あなたの認証コードは：', '有効時間は<b>5分</b>です。他人に漏らさないでください。関連する操作を行ったことがない場合は、無視してください。', 'ありがとうございます。'),
+    'en': ('Verification Code', 'Your verification code is:', 'The effective time is <b>5 minutes</b>. Please do not disclose it to others. If you have not performed the relevant operation, please ignore it.', 'Thanks!'),
+}
+
+# 各语言的验证码邮件模板只在导入时生成一次，发送时仅替换验证码
+CODE_TEMPLATES = {
+    lang: (subject, Template(_CODE_PAGE.substitute(
+        lang=lang, intro=intro, notice=notice, thanks=thanks)))
+    for lang, (subject, intro, notice, thanks) in _CODE_TEXTS.items()
+}
+
+
+def build_code_message(code: str, email: str, lang: str):
+    subject, template = CODE_TEMPLATES.get(lang, CODE_TEMPLATES['en'])
+    message = MIMEMultipart()
+    message['From'] = SENDER_NAME
+    message['To'] = email
+    message['Subject'] = subject
+    message.attach(MIMEText(template.substitute(code=code), 'html'))
+    return message
+
+
+def smtp_settings():
+    config = get_config()
+    return config.smtp_server, config.smtp_port, config.sender_email, config.sender_password
+
+
+class MailDispatcher:
+    '''
+    邮件发送队列：请求线程只负责入队，由若干后台线程各自持有一个已登录的SMTP连接发送，
+    连接断开时自动重连，空闲超过IDLE_TIMEOUT秒后关闭连接
+    '''
+
+    def __init__(self, settings=smtp_settings, workers=MAIL_WORKERS):
+        self.settings = settings
+        self.workers = workers
+        self.sent = 0
+        self.failed = 0
+        self._queue = queue.Queue()
+        self._threads = []
+        self._lock = threading.Lock()
+
+    def start(self):
+        for i in range(self.workers):
+            thread = threading.Thread(
+                target=self._run, name=f'mail-worker-{i}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout=5):
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def join(self):
+        ''' 等待队列中的邮件全部处理完毕 '''
+        self._queue.join()
+
+    def queued(self):
+        return self._queue.qsize()
+
+    def send(self, email: str, message):
+        self._queue.put((email, message))
+
+    def _connect(self, settings):
+        host, port, user, password = settings
+        server = smtplib.SMTP(host, port, timeout=30)
+        if user and password:
+            server.login(user, password)
+        return server
+
+    def _close(self, server):
+        try:
+            server.quit()
+        except (smtplib.SMTPException, OSError):
+            server.close()
+
+    def _deliver(self, server, current, email, message):
+        ''' 发送一封邮件，失败时重连重试，返回当前使用的连接与其配置 '''
+        for attempt in range(MAX_ATTEMPTS):
+            settings = self.settings()
+            try:
+                if server is None or settings != current:
+                    if server is not None:
+                        self._close(server)
+                        server = None
+                    server = self._connect(settings)
+                    current = settings
+                server.sendmail(settings[2], email, message.as_string())
+                with self._lock:
+                    self.sent += 1
+                return server, current
+            except (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, OSError) as e:
+                print(e.args)
+                if server is not None:
+                    server.close()
+                server = None
+            except smtplib.SMTPException as e:
+                print(e.args)
+                break
+        with self._lock:
+            self.failed += 1
+        return server, current
+
+    def _run(self):
+        server, current = None, None
+        while True:
+            try:
+                item = self._queue.get(timeout=IDLE_TIMEOUT)
+            except queue.Empty:
+                if server is not None:
+                    self._close(server)
+                    server = None
+                continue
+            try:
+                if item is None:
+                    break
+                server, current = self._deliver(server, current, *item)
+            except Exception as e:
+                print(e.args)
+            finally:
+                self._queue.task_done()
+        if server is not None:
+            self._close(server)
+
+
+mail_dispatcher = MailDispatcher()
+
+
+def send_code(code: str, email: str, lang: str):
+    ''' 将验证码邮件加入发送队列后立即返回 '''
+    mail_dispatcher.send(email, build_code_message(code, email, lang))
@@ -0,0 +1,98 @@
+from secrets import token_hex
+import anyio
+from starlette.datastructures import Headers
+from starlette.exceptions import HTTPException
+from starlette.responses import FileResponse
+from starlette.staticfiles import StaticFiles, NotModifiedResponse
+from .config import MEDIA_CHUNK_SIZE
+
+# 上传文件按内容哈希（旧文件按uuid）命名，同一地址的内容不会改变
+CACHE_CONTROL = 'public, max-age=31536000, immutable'
+ZEROCOPY = 'http.response.zerocopysend'
+
+
+class MediaFileResponse(FileResponse):
+    '''
+    在FileResponse的基础上：服务器支持ASGI的zerocopysend扩展时直接以文件描述符交给服务器sendfile，
+    否则按MEDIA_CHUNK_SIZE分块读取；多段Range按RFC 7233返回multipart/byteranges
+    '''
+    chunk_size = MEDIA_CHUNK_SIZE
+
+    async def __call__(self, scope, receive, send):
+        self._zerocopy = ZEROCOPY in scope.get('extensions', {})
+        await super().__call__(scope, receive, send)
+
+    async def _send_range(self, send, file, start: int, end: int, more_body: bool):
+        ''' 发送文件中[start, end)的部分，more_body表示之后是否还有内容 '''
+        if self._zerocopy and start < end:
+            await send({'type': ZEROCOPY, 'file': file.wrapped, 'offset': start,
+                        'count': end - start, 'more_body': more_body})
+            return
+        await file.seek(start)
+        while True:
+            chunk = await file.read(min(self.chunk_size, end - start)) if start < end else b''
+            start += len(chunk)
+            last = not chunk or start >= end
+            await send({'type': 'http.response.body', 'body': chunk,
+                        'more_body': more_body or not last})
+            if last:
+                return
+
+    async def _handle_simple(self, send, send_header_only: bool):
+        await send({'type': 'http.response.start', 'status': self.status_code,
+                    'headers': self.raw_headers})
+        if send_header_only:
+            await send({'type': 'http.response.body', 'body': b'', 'more_body': False})
+            return
+        async with await anyio.open_file(self.path, mode='rb') as file:
+            await self._send_range(send, file, 0, int(self.headers['content-length']), False)
+
+    async def _handle_single_range(self, send, start: int, end: int, file_size: int,
+                                   send_header_only: bool):
+        self.headers['content-range'] = f'bytes {start}-{end - 1}/{file_size}'
+        self.headers['content-length'] = str(end - start)
+        await send({'type': 'http.response.start', 'status': 206, 'headers': self.raw_headers})
+        if send_header_only:
+            await send({'type': 'http.response.body', 'body': b'', 'more_body': False})
+            return
+        async with await anyio.open_file(self.path, mode='rb') as file:
+            await self._send_range(send, file, start, end, False)
+
+    async def _handle_multiple_ranges(self, send, ranges, file_size: int, send_header_only: bool):
+        boundary = token_hex(13)
+        content_type = self.headers['content-type']
+        parts = [(f'--{boundary}\r\nContent-Type: {content_type}\r\n'
+                  f'Content-Range: bytes {start}-{end - 1}/{file_size}\r\n\r\n').encode('latin-1')
+                 for start, end in ranges]
+        closing = f'--{boundary}--\r\n'.encode('latin-1')
+        self.headers['content-type'] = f'multipart/byteranges; boundary={boundary}'
+        self.headers['content-length'] = str(
+            sum(len(part) + end - start + 2 for part, (start, end) in zip(parts, ranges))
+            + len(closing))
+        await send({'type': 'http.response.start', 'status': 206, 'headers': self.raw_headers})
+        if send_header_only:
+            await send({'type': 'http.response.body', 'body': b'', 'more_body': False})
+            return
+        async with await anyio.open_file(self.path, mode='rb') as file:
+            for part, (start, end) in zip(parts, ranges):
+                await send({'type': 'http.response.body', 'body': part, 'more_body': True})
+                await self._send_range(send, file, start, end, True)
+                await send({'type': 'http.response.body', 'body': b'\r\n', 'more_body': True})
+            await send({'type': 'http.response.body', 'body': closing, 'more_body': False})
+
+
+class MediaFiles(StaticFiles):
+    ''' /files下的上传文件：支持Range与多段Range，带长期缓存头、ETag与Last-Modified '''
+
+    async def get_response(self, path: str, scope):
+        # 上传过程中的临时文件不对外提供
+        if path.replace('\\', '/').split('/', 1)[0] == 'tmp':
+            raise HTTPException(status_code=404)
+        return await super().get_response(path, scope)
+
+    def file_response(self, full_path, stat_result, scope, status_code=200):
+        response = MediaFileResponse(full_path, status_code=status_code, stat_result=stat_result,
+                                     headers={'Cache-Control': CACHE_CONTROL})
+        if self.is_not_modified(response.headers, Headers(scope=scope)):
+            return NotModifiedResponse(response.headers)
+        return response
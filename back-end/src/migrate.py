@@ -0,0 +1,58 @@
+import os
+from contextlib import contextmanager
+from alembic import command
+from alembic.config import Config as AlembicConfig
+from sqlalchemy import inspect, text
+from .database import engine
+
+ALEMBIC_INI = os.path.join(os.path.dirname(
+    os.path.dirname(os.path.abspath(__file__))), 'alembic.ini')
+MIGRATE_LOCK = 'egaku_migrate'
+# 等待其他进程完成迁移（包括重建搜索索引）的最长秒数
+MIGRATE_LOCK_TIMEOUT = 600
+
+
+def alembic_config(connection=None):
+    config = AlembicConfig(ALEMBIC_INI)
+    config.attributes['configure_logger'] = False
+    config.attributes['connection'] = connection
+    return config
+
+
+@contextmanager
+def _migrate_lock():
+    '''
+    MySQL下用GET_LOCK保证同时只有一个进程在迁移，其余进程等待它完成后再检查版本，此时已无需迁移。
+    其他数据库（本地开发用的SQLite）不加锁
+    '''
+    if engine.dialect.name != 'mysql':
+        yield
+        return
+    with engine.connect() as connection:
+        locked = connection.execute(text('SELECT GET_LOCK(:name, :timeout)'), {
+            'name': MIGRATE_LOCK, 'timeout': MIGRATE_LOCK_TIMEOUT}).scalar()
+        if locked != 1:
+            raise RuntimeError('MIGRATE_LOCK_TIMEOUT')
+        try:
+            yield
+        finally:
+            connection.execute(text('SELECT RELEASE_LOCK(:name)'), {'name': MIGRATE_LOCK})
+
+
+def upgrade(revision='head'):
+    '''
+    将数据库迁移到指定版本。此前由create_all建表、尚无版本记录的数据库也从基线版本开始迁移，
+    基线只补建其中缺少的表；搜索索引表是新建的时从文章与视频重建索引。
+    多个进程同时调用时只有一个执行迁移与重建，其余等待
+    '''
+    with _migrate_lock():
+        with engine.begin() as connection:
+            tables = inspect(connection).get_table_names()
+            command.upgrade(alembic_config(connection), revision)
+        if 'search_index' not in tables:
+            from .search import rebuild_index
+            rebuild_index()
+
+
+if __name__ == '__main__':
+    upgrade()
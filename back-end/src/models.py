@@ -1,4 +1,5 @@
-from sqlalchemy import Column, BIGINT, VARCHAR, INT, DATETIME, BOOLEAN, TEXT
+from sqlalchemy import Column, Index, BIGINT, VARCHAR, INT, DATETIME, BOOLEAN, TEXT
+from sqlalchemy.orm import deferred
 from .database import Base, TimestampDateTime, BigIntStr
 
 
@@ -28,10 +29,16 @@ class User(Base):
     admin = Column(BOOLEAN)
     disable_reminder = Column(INT)
     remind_after = Column(TimestampDateTime)
+    # 删除该用户的全部token时递增，各进程的token缓存据此失效
+    token_version = Column(INT, nullable=False, default=0)
 
 
 class Token(Base):
     __tablename__ = 'token'
+    __table_args__ = (
+        Index('ix_token_token', 'token'),
+        Index('ix_token_uid', 'uid'),
+    )
     id = Column(BigIntStr, primary_key=True,
                 autoincrement=True, index=True, unique=True)
     uid = Column(BigIntStr, nullable=False)
@@ -41,6 +48,9 @@ class Token(Base):
 
 class Verification(Base):
     __tablename__ = 'verification'
+    __table_args__ = (
+        Index('ix_verification_email_expire_time', 'email', 'expire_time'),
+    )
     id = Column(BigIntStr, primary_key=True,
                 autoincrement=True, index=True, unique=True)
     email = Column(VARCHAR(255), nullable=False)
@@ -50,9 +60,15 @@ class Verification(Base):
 
 class UploadedFile(Base):
     __tablename__ = 'uploaded_file'
+    __table_args__ = (
+        Index('ix_uploaded_file_uid', 'uid'),
+        Index('ix_uploaded_file_hash', 'hash'),
+    )
     id = Column(BigIntStr, primary_key=True,
                 autoincrement=True, index=True, unique=True)
     url = Column(VARCHAR(512), nullable=False)
+    # 文件内容的sha256，用于去重；旧数据为空
+    hash = Column(VARCHAR(64))
     filename = Column(VARCHAR(255), nullable=False)
     uid = Column(BigIntStr, nullable=False)
     upload_time = Column(TimestampDateTime, nullable=False)
@@ -60,12 +76,17 @@ class UploadedFile(Base):
 
 class Article(Base):
     __tablename__ = 'article'
+    __table_args__ = (
+        Index('ix_article_status_submit_time', 'status', 'submit_time'),
+        Index('ix_article_uid_status_submit_time', 'uid', 'status', 'submit_time'),
+    )
     id = Column(BigIntStr, primary_key=True,
                 autoincrement=True, index=True, unique=True)
     uid = Column(BigIntStr, nullable=False)
     submit_time = Column(TimestampDateTime, nullable=False)
     title = Column(VARCHAR(50), nullable=False)
-    content = Column(TEXT, nullable=False)
+    # 正文可能内嵌图片，体积很大，只在访问该属性或查询时undefer才加载
+    content = deferred(Column(TEXT, nullable=False))
     preview = Column(VARCHAR(51), nullable=False)
     status = Column(INT, nullable=False)
     desc = Column(VARCHAR(255))
@@ -73,6 +94,10 @@ class Article(Base):
 
 class Video(Base):
     __tablename__ = 'video'
+    __table_args__ = (
+        Index('ix_video_status_submit_time', 'status', 'submit_time'),
+        Index('ix_video_uid_status_submit_time', 'uid', 'status', 'submit_time'),
+    )
     id = Column(BigIntStr, primary_key=True,
                 autoincrement=True, index=True, unique=True)
     uid = Column(BigIntStr, nullable=False)
@@ -86,6 +111,11 @@ class Video(Base):
 
 class Collection(Base):
     __tablename__ = 'collection'
+    __table_args__ = (
+        Index('ix_collection_uid_time', 'uid', 'time'),
+        Index('ix_collection_uid_type_submission_id', 'uid', 'type', 'submission_id'),
+        Index('ix_collection_submission_id_type', 'submission_id', 'type'),
+    )
     id = Column(BigIntStr, primary_key=True,
                 autoincrement=True, index=True, unique=True)
     uid = Column(BigIntStr, nullable=False)
@@ -96,6 +126,9 @@ class Collection(Base):
 
 class Comment(Base):
     __tablename__ = 'comment'
+    __table_args__ = (
+        Index('ix_comment_submission_id_type_time', 'submission_id', 'type', 'time'),
+    )
     id = Column(BigIntStr, primary_key=True,
                 autoincrement=True, index=True, unique=True)
     uid = Column(BigIntStr, nullable=False)
@@ -107,7 +140,99 @@ class Comment(Base):
 
 class Follow(Base):
     __tablename__ = 'follow'
+    __table_args__ = (
+        Index('ix_follow_uid_follower_id', 'uid', 'follower_id'),
+        Index('ix_follow_follower_id', 'follower_id'),
+    )
     id = Column(BigIntStr, primary_key=True,
                 autoincrement=True, index=True, unique=True)
     uid = Column(BigIntStr, nullable=False)
     follower_id = Column(BigIntStr, nullable=False)
+
+
+class SearchIndex(Base):
+    __tablename__ = 'search_index'
+    __table_args__ = (
+        # 覆盖检索查询用到的所有列，按词查找与分组统计只读索引
+        Index('ix_search_index_token_cover',
+              'token', 'type', 'submission_id', 'weight', 'submit_time'),
+    )
+    id = Column(BigIntStr, primary_key=True,
+                autoincrement=True, index=True, unique=True)
+    token = Column(VARCHAR(32), nullable=False)
+    submission_id = Column(BigIntStr, nullable=False, index=True)
+    type = Column(INT, nullable=False)
+    weight = Column(INT, nullable=False)
+    submit_time = Column(TimestampDateTime, nullable=False)
+
+
+class ReviewTask(Base):
+    __tablename__ = 'review_task'
+    __table_args__ = (
+        Index('ix_review_task_status_next_run_time', 'status', 'next_run_time'),
+    )
+    id = Column(BigIntStr, primary_key=True,
+                autoincrement=True, index=True, unique=True)
+    submission_id = Column(BigIntStr, nullable=False)
+    type = Column(INT, nullable=False)
+    uid = Column(BigIntStr, nullable=False)
+    content = Column(TEXT, nullable=False)
+    status = Column(INT, nullable=False)
+    attempts = Column(INT, nullable=False)
+    next_run_time = Column(TimestampDateTime, nullable=False)
+    last_error = Column(VARCHAR(255))
+
+
+class SummaryCache(Base):
+    __tablename__ = 'summary_cache'
+    hash = Column(VARCHAR(64), primary_key=True)
+    summary = Column(TEXT, nullable=False)
+    create_time = Column(TimestampDateTime, nullable=False)
+
+
+class UserStats(Base):
+    __tablename__ = 'user_stats'
+    uid = Column(BigIntStr, primary_key=True)
+    article_total = Column(INT, nullable=False, default=0)
+    video_total = Column(INT, nullable=False, default=0)
+    follower_total = Column(INT, nullable=False, default=0)
+    unread_reply = Column(INT, nullable=False, default=0)
+    celebrity = Column(BOOLEAN, nullable=False, default=False)
+
+
+class Submission(Base):
+    __tablename__ = 'submission'
+    __table_args__ = (
+        Index('ix_submission_status_submit_time',
+              'status', 'submit_time', 'type', 'id'),
+        Index('ix_submission_uid_status_submit_time',
+              'uid', 'status', 'submit_time', 'type', 'id'),
+        Index('ix_submission_uid_submit_time',
+              'uid', 'submit_time', 'type', 'id'),
+    )
+    id = Column(BigIntStr, primary_key=True, autoincrement=False)
+    type = Column(INT, primary_key=True, autoincrement=False)
+    uid = Column(BigIntStr, nullable=False)
+    status = Column(INT, nullable=False)
+    submit_time = Column(TimestampDateTime, nullable=False)
+    title = Column(VARCHAR(50), nullable=False)
+    preview = Column(VARCHAR(255), nullable=False)
+    desc = Column(VARCHAR(255))
+
+
+class Timeline(Base):
+    __tablename__ = 'timeline'
+    __table_args__ = (
+        Index('ix_timeline_uid_submit_time',
+              'uid', 'submit_time', 'type', 'submission_id'),
+        Index('ix_timeline_uid_type_submission_id',
+              'uid', 'type', 'submission_id', unique=True),
+        Index('ix_timeline_type_submission_id', 'type', 'submission_id'),
+        Index('ix_timeline_uid_author_uid', 'uid', 'author_uid'),
+    )
+    id = Column(BigIntStr, primary_key=True, autoincrement=True)
+    uid = Column(BigIntStr, nullable=False)
+    type = Column(INT, nullable=False)
+    submission_id = Column(BigIntStr, nullable=False)
+    author_uid = Column(BigIntStr, nullable=False)
+    submit_time = Column(TimestampDateTime, nullable=False)
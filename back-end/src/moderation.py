@@ -0,0 +1,158 @@
+import random
+import threading
+from .database import SessionLocal
+from .models import ReviewTask, Article
+from .search import index_submission
+from .submissions import sync_submission
+from .timeline import fan_out
+from .paging import SUBMISSION_SCOPES
+from .cache import invalidate
+from .stats import submission_status_changed
+from . import utils
+from .baidu import text_censor
+
+REVIEW_WORKERS = 2
+POLL_INTERVAL = 1
+MAX_ATTEMPTS = 5
+RETRY_BASE = 5 * 1000
+RETRY_MAX = 10 * 60 * 1000
+LEASE_TIME = 2 * 60 * 1000
+
+# 审核任务状态：0待处理，1处理中（next_run_time为租约到期时间），2完成，3失败
+PENDING, RUNNING, DONE, FAILED = 0, 1, 2, 3
+
+
+def enqueue_review(db, type: int, id: str, uid: str, content: str):
+    ''' 将投稿加入审核队列，与投稿在同一事务中由调用方提交 '''
+    db.add(ReviewTask(
+        submission_id=id,
+        type=type,
+        uid=uid,
+        content=content,
+        status=PENDING,
+        attempts=0,
+        next_run_time=utils.time(),
+    ))
+
+
+def _review_article(db, task):
+    result = text_censor(task.content)
+    print(result)
+    if not result or 'conclusion' not in result:
+        raise RuntimeError(result and result.get('error_msg'))
+    article = db.query(Article).filter(
+        Article.id == task.submission_id).first()
+    if not article or article.status != 0:
+        return
+    if result['conclusion'] == '合规':
+        article.status = 1
+        submission_status_changed(db, 0, article.uid, 0, 1)
+        index_submission(db, 0, article)
+        fan_out(db, 0, article)
+        utils.exp_plus(db, task.uid, 20)
+    else:
+        article.status = 2
+        article.desc = '; '.join(
+            list(map(lambda obj: obj['msg'], result['data'])))
+    sync_submission(db, 0, article)
+
+
+# 各投稿类型的自动审核，视频没有自动审核，不入队，由管理员审核
+REVIEWERS = {0: _review_article}
+
+
+def due_tasks(db, now: int):
+    return db.query(ReviewTask).filter(
+        ReviewTask.status.in_([PENDING, RUNNING]),
+        ReviewTask.type.in_(list(REVIEWERS)),
+        ReviewTask.next_run_time <= now,
+    ).order_by(ReviewTask.next_run_time)
+
+
+def _claim(db):
+    ''' 领取一个到期的任务（包括租约过期的处理中任务），多进程间通过SKIP LOCKED互斥 '''
+    now = utils.time()
+    task = due_tasks(db, now).with_for_update(skip_locked=True).first()
+    if not task:
+        db.commit()
+        return None
+    task.status = RUNNING
+    task.next_run_time = now + LEASE_TIME
+    db.commit()
+    return task
+
+
+def _backoff(attempts: int):
+    delay = min(RETRY_BASE * 2 ** (attempts - 1), RETRY_MAX)
+    return delay * random.uniform(0.5, 1)
+
+
+def run_once():
+    ''' 处理一个审核任务，没有可处理的任务时返回False '''
+    db = SessionLocal()
+    try:
+        task = _claim(db)
+        if not task:
+            return False
+        try:
+            REVIEWERS[task.type](db, task)
+            task.status = DONE
+            db.commit()
+            invalidate(SUBMISSION_SCOPES[task.type])
+        except Exception as e:
+            db.rollback()
+            print(e.args)
+            task.attempts = task.attempts + 1
+            task.last_error = str(e.args)[:255]
+            if task.attempts >= MAX_ATTEMPTS:
+                task.status = FAILED
+            else:
+                task.status = PENDING
+                task.next_run_time = utils.time() + _backoff(task.attempts)
+            db.commit()
+        return True
+    finally:
+        db.close()
+
+
+class ReviewWorkerPool:
+    ''' 后台审核线程池，从review_task表中领取任务，失败时按指数退避重试 '''
+
+    def __init__(self, workers=REVIEW_WORKERS, poll_interval=POLL_INTERVAL):
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self._threads = []
+        self._stop = threading.Event()
+        self._wakeup = threading.Event()
+
+    def start(self):
+        self._stop.clear()
+        for i in range(self.workers):
+            thread = threading.Thread(
+                target=self._run, name=f'review-worker-{i}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout=5):
+        self._stop.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def notify(self):
+        ''' 有新任务入队时唤醒空闲的线程 '''
+        self._wakeup.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                if run_once():
+                    continue
+            except Exception as e:
+                print(e.args)
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
+
+
+review_workers = ReviewWorkerPool()
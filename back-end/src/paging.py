@@ -0,0 +1,124 @@
+import json
+import base64
+from sqlalchemy import and_, or_, func, literal, Integer, Numeric, Float, String
+from .database import TimestampDateTime, BigIntStr
+from .cache import TTLCache, data_versions
+
+COUNT_TTL = 30
+COUNT_LIMIT = 10000
+MAX_BIGINT = 2 ** 63 - 1
+# 9999-12-31 23:59:59.999的毫秒时间戳
+MAX_TIMESTAMP = 253402300799999
+# 投稿类型对应的缓存范围
+SUBMISSION_SCOPES = {0: 'article', 1: 'video'}
+
+_count_cache = TTLCache(maxsize=4096, ttl=COUNT_TTL)
+
+
+class InvalidCursor(ValueError):
+    ''' 客户端传入的游标无法解析或与排序键不匹配，接口应返回PARAM_ERROR '''
+
+
+def encode_cursor(*values):
+    ''' 将排序键编码为不透明的游标字符串 '''
+    raw = json.dumps(values, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str):
+    ''' 解析游标，为空时返回None，格式错误时抛出InvalidCursor '''
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except ValueError:
+        # binascii.Error、UnicodeDecodeError与JSONDecodeError均为ValueError的子类
+        raise InvalidCursor('INVALID_CURSOR')
+    if not isinstance(values, list) or not all(
+            value is None or isinstance(value, (str, int, float)) for value in values):
+        raise InvalidCursor('INVALID_CURSOR')
+    return values
+
+
+def _valid_key(key, value):
+    ''' 游标中的值是否与排序键的类型相符，任何排序键都不能为None '''
+    if value is None or isinstance(value, bool):
+        return False
+    if isinstance(key.type, BigIntStr):
+        if isinstance(value, str) and value.isascii() and value.isdigit():
+            value = int(value)
+        return isinstance(value, int) and 0 <= value <= MAX_BIGINT
+    if isinstance(key.type, TimestampDateTime):
+        return isinstance(value, int) and 0 <= value <= MAX_TIMESTAMP
+    if isinstance(key.type, Integer):
+        return isinstance(value, int) and -MAX_BIGINT <= value <= MAX_BIGINT
+    if isinstance(key.type, (Numeric, Float)):
+        return isinstance(value, (int, float))
+    if isinstance(key.type, String):
+        return isinstance(value, str)
+    return True
+
+
+def keyset(cursor, *keys, reverse=False):
+    '''
+    生成位于游标之后的行的过滤条件，keys为排序列（默认降序，reverse=True时升序），
+    非列的常量排序键会被包装为literal。游标的长度或值的类型与排序键不符时抛出InvalidCursor
+    '''
+    if len(cursor) != len(keys):
+        raise InvalidCursor('INVALID_CURSOR')
+    keys = [key if hasattr(key, 'expression') else literal(key)
+            for key in keys]
+    if not all(_valid_key(key, value) for key, value in zip(keys, cursor)):
+        raise InvalidCursor('INVALID_CURSOR')
+    conditions = []
+    for i, key in enumerate(keys):
+        equals = [keys[j] == cursor[j] for j in range(i)]
+        beyond = key > cursor[i] if reverse else key < cursor[i]
+        conditions.append(and_(*equals, beyond))
+    return or_(*conditions)
+
+
+def next_cursor(result, has_more: bool, *names):
+    ''' 还有下一页时，用当前页最后一行的排序键生成下一页游标 '''
+    if not result or not has_more:
+        return None
+    return encode_cursor(*[getattr(result[-1], name) for name in names])
+
+
+def fetch_page(query, page_size: int):
+    ''' 执行多取一行的分页查询，返回(当前页, 是否还有下一页) '''
+    rows = query.all()
+    return rows[:page_size], len(rows) > page_size
+
+
+def count_total(db, query, data, scopes, limit=COUNT_LIMIT):
+    '''
+    统计分页查询（不含翻页条件）的总数，返回(总数, 是否达到上限)，客户端传withTotal=false时不统计，返回(None, False)。
+    结果按查询结构与参数缓存COUNT_TTL秒，scopes中的表有写入时失效；
+    总数超过limit时只统计到limit并返回True，此时总数只是下限，接口以totalCapped告知客户端
+    '''
+    if not data.withTotal:
+        return None, False
+    compiled = query.statement.compile()
+    key = (str(compiled), repr(sorted(compiled.params.items())))
+    versions = data_versions.snapshot(scopes)
+    cached = _count_cache.get(key)
+    if cached and cached[1] == versions:
+        return cached[0]
+    # 多数一行以区分恰好limit行与超过limit行
+    total = db.execute(db.query(func.count()).select_from(
+        query.order_by(None).limit(limit + 1).subquery())).scalar()
+    result = (min(total, limit), total > limit)
+    _count_cache.set(key, (result, versions))
+    return result
+
+
+def paginate(query, data, *keys, reverse=False):
+    ''' 有游标时按keyset翻页，否则按页码翻页，多取一行用于判断是否还有下一页 '''
+    cursor = decode_cursor(data.cursor)
+    if cursor:
+        query = query.filter(keyset(cursor, *keys, reverse=reverse))
+    else:
+        query = query.offset((data.pageNum - 1) * data.pageSize)
+    return query.limit(data.pageSize + 1)
@@ -0,0 +1,115 @@
+import os
+import sys
+import threading
+import time as _time
+from collections import deque
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+SOURCE_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STACK_DEPTH = 8
+RECENT_LEAKS = 20
+
+
+def _caller_stack():
+    ''' 取调用栈中属于本项目的帧，只保存(文件, 行号, 函数名)，开销远小于traceback.extract_stack '''
+    stack = []
+    frame = sys._getframe(2)
+    while frame is not None and len(stack) < STACK_DEPTH:
+        code = frame.f_code
+        if code.co_filename.startswith(SOURCE_ROOT) and code.co_filename != __file__:
+            stack.append((os.path.relpath(code.co_filename, SOURCE_ROOT),
+                          frame.f_lineno, code.co_name))
+        frame = frame.f_back
+    return stack
+
+
+def _format_stack(stack):
+    return [f'{filename}:{lineno} {name}' for filename, lineno, name in stack]
+
+
+class PoolMonitor:
+    '''
+    连接池监控：记录借出次数、等待连接的时间与超时次数，并保存每个借出连接的调用栈。
+    连接被持有超过leak_seconds秒即视为泄漏，归还时计数并保留最近的调用栈
+    '''
+
+    def __init__(self, leak_seconds: float):
+        self.leak_seconds = leak_seconds
+        self.checkouts = 0
+        self.timeouts = 0
+        self.leaks = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self._held = {}
+        self._recent_leaks = deque(maxlen=RECENT_LEAKS)
+        self._lock = threading.Lock()
+
+    def attach(self, engine):
+        event.listen(engine, 'checkout', self._checkout)
+        event.listen(engine, 'checkin', self._checkin)
+
+    def record_wait(self, seconds: float, timed_out=False):
+        with self._lock:
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+            if timed_out:
+                self.timeouts += 1
+
+    def _checkout(self, dbapi_connection, record, proxy):
+        with self._lock:
+            self.checkouts += 1
+            self._held[id(record)] = (_time.monotonic(), _caller_stack())
+
+    def _checkin(self, dbapi_connection, record):
+        with self._lock:
+            item = self._held.pop(id(record), None)
+            if item is None:
+                return
+            held = _time.monotonic() - item[0]
+            if held >= self.leak_seconds:
+                self.leaks += 1
+                self._recent_leaks.append({
+                    'heldSeconds': round(held, 1),
+                    'stack': _format_stack(item[1]),
+                })
+
+    def snapshot(self, pool):
+        now = _time.monotonic()
+        with self._lock:
+            held = sorted(self._held.values(), key=lambda item: item[0])
+            checkouts = self.checkouts
+            return {
+                'size': pool.size(),
+                'checkedOut': pool.checkedout(),
+                'checkedIn': pool.checkedin(),
+                'overflow': pool.overflow(),
+                'checkouts': checkouts,
+                'waitAvgMs': round(self.wait_total / checkouts * 1000, 2) if checkouts else 0,
+                'waitMaxMs': round(self.wait_max * 1000, 2),
+                'timeouts': self.timeouts,
+                'leaks': self.leaks,
+                # 仍未归还且已超过leak_seconds的连接
+                'held': [{
+                    'heldSeconds': round(now - start, 1),
+                    'stack': _format_stack(stack),
+                } for start, stack in held if now - start >= self.leak_seconds],
+                'recentLeaks': list(self._recent_leaks),
+            }
+
+
+def instrumented_pool(pool_class, monitor: PoolMonitor):
+    ''' 返回pool_class的子类，统计每次获取连接的等待时间 '''
+    class InstrumentedPool(pool_class):
+        def _do_get(self):
+            start = _time.monotonic()
+            try:
+                connection = super()._do_get()
+            except PoolTimeoutError:
+                monitor.record_wait(_time.monotonic() - start, timed_out=True)
+                raise
+            monitor.record_wait(_time.monotonic() - start)
+            return connection
+
+    InstrumentedPool.__name__ = f'Instrumented{pool_class.__name__}'
+    return InstrumentedPool
@@ -0,0 +1,104 @@
+from sqlalchemy import desc
+from .models import *
+from .submissions import feed
+
+# 各接口的主要查询。接口与tools/explain_check使用同一个函数构造查询，检查结果与实际执行的SQL一致
+
+
+def user_by_login(db, account_or_email: str):
+    if '@' in account_or_email:
+        return db.query(User).filter(User.email == account_or_email)
+    return db.query(User).filter(User.account == account_or_email)
+
+
+def latest_verification(db, email: str):
+    return db.query(Verification).filter(
+        Verification.email == email).order_by(Verification.expire_time.desc())
+
+
+def token_by_value(db, token: str):
+    return db.query(Token).filter(Token.token == token).order_by(Token.expire_time.desc())
+
+
+def user_tokens(db, uid: str):
+    return db.query(Token).filter(Token.uid == uid)
+
+
+def token_version(db, uid: str):
+    return db.query(User.token_version).filter(User.uid == uid)
+
+
+def user_with_stats(db, uid: str):
+    return db.query(User, UserStats).outerjoin(
+        UserStats, UserStats.uid == User.uid).filter(User.uid == uid)
+
+
+def user_submissions(db, uid: str, published=False):
+    if published:
+        return feed(db, Submission.uid == uid, Submission.status == 1)
+    return feed(db, Submission.uid == uid)
+
+
+def submissions_need_review(db):
+    return feed(db, Submission.status.in_([0, 3]))
+
+
+def files_by_hash(db, digest: str):
+    return db.query(UploadedFile.url).filter(UploadedFile.hash == digest).distinct()
+
+
+def user_collections(db, uid: str):
+    return db.query(Collection).filter(
+        Collection.uid == uid).order_by(desc(Collection.time), desc(Collection.id))
+
+
+def user_collection(db, uid: str, type: int, submission_id: str):
+    return db.query(Collection).filter(Collection.type == type, Collection.uid == uid,
+                                       Collection.submission_id == submission_id)
+
+
+def submission_collections(db, type: int, submission_id: str):
+    return db.query(Collection).filter(
+        Collection.submission_id == submission_id, Collection.type == type)
+
+
+def follow_relation(db, author_uid: str, uid: str):
+    return db.query(Follow).filter(Follow.uid == author_uid, Follow.follower_id == uid)
+
+
+def user_follows(db, uid: str):
+    return db.query(Follow).filter(Follow.follower_id == uid).order_by(Follow.id)
+
+
+def submission_comments(db, type: int, submission_id: str):
+    return db.query(Comment).filter(
+        Comment.submission_id == submission_id, Comment.type == type).order_by(
+        Comment.time.desc(), Comment.id.desc())
+
+
+def user_replies(db, uid: str):
+    articles = db.query(Article.id).filter(Article.uid == uid)
+    videos = db.query(Video.id).filter(Video.uid == uid)
+    return db.query(Comment).filter(
+        ((Comment.uid != uid) & (Comment.type == 0) & Comment.submission_id.in_(articles)) |
+        ((Comment.type == 1) & Comment.submission_id.in_(videos))).order_by(
+        Comment.time.desc(), Comment.id.desc())
+
+
+def public_articles(db):
+    return db.query(
+        Article.id,
+        Article.uid,
+        Article.submit_time,
+        Article.title,
+        Article.preview,
+    ).filter(Article.status == 1).order_by(desc(Article.submit_time), desc(Article.id))
+
+
+def public_videos(db):
+    return db.query(Video).filter(
+        Video.status == 1).order_by(desc(Video.submit_time), desc(Video.id))
+
+
+def article_content(db, id: str):
+    return db.query(Article.uid, Article.status, Article.content).filter(Article.id == id)
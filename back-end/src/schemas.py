@@ -51,8 +51,10 @@ class CommonUid(BaseModel):
 
 class CommonList(BaseModel):
     uid: Optional[str] = None
-    pageNum: int
+    pageNum: int = 1
     pageSize: int
+    cursor: Optional[str] = None
+    withTotal: bool = True
 
 
 class CommonUpd(BaseModel):
@@ -70,8 +72,10 @@ class CommonId(BaseModel):
 class UserGetComment(BaseModel):
     id: str
     type: int
-    pageNum: int
+    pageNum: int = 1
     pageSize: int
+    cursor: Optional[str] = None
+    withTotal: bool = True
 
 
 class UserSendComment(BaseModel):
@@ -86,14 +90,18 @@ class ArticleSummary(BaseModel):
 
 
 class UserGetReply(BaseModel):
-    pageNum: int
+    pageNum: int = 1
     pageSize: int
+    cursor: Optional[str] = None
+    withTotal: bool = True
 
 
 class CommonSearch(BaseModel):
     content: str
-    pageNum: int
+    pageNum: int = 1
     pageSize: int
+    cursor: Optional[str] = None
+    withTotal: bool = True
 
 
 class CommonImageProcessing(BaseModel):
@@ -0,0 +1,160 @@
+import re
+import json
+from collections import Counter
+from sqlalchemy import func, desc, insert, cast, INT
+from .database import SessionLocal
+from .models import SearchIndex, Article, Video
+from .paging import decode_cursor, keyset, count_total, fetch_page
+
+TITLE_WEIGHT = 5
+CONTENT_WEIGHT = 1
+MAX_CONTENT_HITS = 10
+MAX_TOTAL = 1000
+MAX_QUERY_TOKENS = 32
+# 每个词最多保留的索引行数，超出时删除权重最低、投稿最早的，高频词的检索开销不随投稿数增长
+MAX_POSTINGS = 5000
+
+_CJK = '぀-ヿ㐀-䶿一-鿿豈-﫿가-힯'
+_TOKEN_RE = re.compile(f'([{_CJK}]+)|([0-9a-zÀ-ɏ]+)')
+
+
+def _plain_text(content: str):
+    ''' 从Draft.js的原始内容中提取纯文本，非JSON内容原样返回 '''
+    try:
+        raw = json.loads(content)
+        return '\n'.join(block.get('text', '') for block in raw['blocks'])
+    except (ValueError, TypeError, KeyError, AttributeError):
+        return content or ''
+
+
+def tokenize(text: str, query=False):
+    '''
+    分词：中日韩文字切分为二元组（建索引时额外保留单字以支持单字检索），
+    其他文字按单词切分并转为小写
+    '''
+    tokens = []
+    for match in _TOKEN_RE.finditer((text or '').lower()):
+        cjk, word = match.groups()
+        if word:
+            tokens.append(word[:32])
+            continue
+        bigrams = [cjk[i:i + 2] for i in range(len(cjk) - 1)]
+        if query:
+            tokens.extend(bigrams or [cjk])
+        else:
+            tokens.extend(cjk)
+            tokens.extend(bigrams)
+    return tokens
+
+
+def _postings(title: str, content: str):
+    weights = Counter()
+    for tok in tokenize(title):
+        weights[tok] += TITLE_WEIGHT
+    hits = Counter(tokenize(content))
+    for tok, n in hits.items():
+        weights[tok] += min(n, MAX_CONTENT_HITS) * CONTENT_WEIGHT
+    return weights
+
+
+def remove_submission(db, type: int, id: str):
+    ''' 从索引中移除投稿，由调用方提交事务 '''
+    db.query(SearchIndex).filter(SearchIndex.submission_id == id,
+                                 SearchIndex.type == type).delete()
+
+
+def posting_floor(db, token: str):
+    ''' 词的第MAX_POSTINGS + 1行索引的(权重, 投稿时间)，不小于它的行都应被裁剪 '''
+    return db.query(SearchIndex.weight, SearchIndex.submit_time).filter(
+        SearchIndex.token == token).order_by(
+        desc(SearchIndex.weight), desc(SearchIndex.submit_time)).offset(MAX_POSTINGS).limit(1)
+
+
+def _prune_postings(db, tokens):
+    ''' 将tokens中索引行数超过MAX_POSTINGS的词裁剪到按(权重, 投稿时间)排序的前MAX_POSTINGS行，由调用方提交事务 '''
+    hot = [row.token for row in db.query(SearchIndex.token).filter(
+        SearchIndex.token.in_(tokens)).group_by(SearchIndex.token).having(
+        func.count() > MAX_POSTINGS)]
+    for tok in hot:
+        floor = posting_floor(db, tok).first()
+        if floor:
+            db.query(SearchIndex).filter(
+                SearchIndex.token == tok,
+                ~keyset(list(floor), SearchIndex.weight, SearchIndex.submit_time, reverse=True),
+            ).delete(synchronize_session=False)
+
+
+def index_submission(db, type: int, obj):
+    ''' 为已过审的文章（type=0）或视频（type=1）重建索引，由调用方提交事务 '''
+    remove_submission(db, type, obj.id)
+    content = _plain_text(obj.content) if type == 0 else ''
+    rows = [{
+        'token': tok,
+        'submission_id': obj.id,
+        'type': type,
+        'weight': weight,
+        'submit_time': obj.submit_time,
+    } for tok, weight in _postings(obj.title, content).items()]
+    if rows:
+        db.execute(insert(SearchIndex), rows)
+        _prune_postings(db, [row['token'] for row in rows])
+
+
+def match_query(db, tokens):
+    ''' 按投稿统计命中的词数与权重之和，返回(查询, 命中词数列, 权重列) '''
+    matched = func.count(SearchIndex.token).label('matched')
+    score = cast(func.sum(SearchIndex.weight), INT).label('score')
+    hits = db.query(
+        SearchIndex.submission_id,
+        SearchIndex.type,
+        SearchIndex.submit_time,
+        matched,
+        score,
+    ).filter(SearchIndex.token.in_(tokens)).group_by(
+        SearchIndex.submission_id, SearchIndex.type, SearchIndex.submit_time)
+    return hits, matched, score
+
+
+def search(db, data):
+    '''
+    按关键词检索已过审的投稿，按命中词数、权重、投稿时间排序，支持页码与游标翻页。
+    总数最多统计到MAX_TOTAL，返回(total, 总数是否达到上限, [submission_id, type, submit_time, matched, score], 是否还有下一页)
+    '''
+    tokens = list(dict.fromkeys(tokenize(data.content, query=True)))[
+        :MAX_QUERY_TOKENS]
+    if not tokens:
+        return (0 if data.withTotal else None), False, [], False
+    hits, matched, score = match_query(db, tokens)
+    total, capped = count_total(db, hits, data, ('article', 'video'), MAX_TOTAL)
+    hits = hits.order_by(desc(matched), desc(score), desc(SearchIndex.submit_time),
+                         desc(SearchIndex.type), desc(SearchIndex.submission_id))
+    cursor = decode_cursor(data.cursor)
+    if cursor:
+        hits = hits.having(keyset(cursor, matched, score, SearchIndex.submit_time,
+                                  SearchIndex.type, SearchIndex.submission_id))
+    else:
+        hits = hits.offset((data.pageNum - 1) * data.pageSize)
+    hits, has_more = fetch_page(hits.limit(data.pageSize + 1), data.pageSize)
+    return total, capped, hits, has_more
+
+
+def rebuild_index(batch_size=500):
+    ''' 全量重建索引，用于初始化或修复 '''
+    db = SessionLocal()
+    try:
+        db.query(SearchIndex).delete()
+        db.commit()
+        for type, model in ((0, Article), (1, Video)):
+            ids = [obj.id for obj in db.query(
+                model.id).filter(model.status == 1)]
+            for i in range(0, len(ids), batch_size):
+                for obj in db.query(model).filter(model.id.in_(ids[i:i + batch_size])):
+                    index_submission(db, type, obj)
+                db.commit()
+                db.expunge_all()
+    finally:
+        db.close()
+
+
+if __name__ == '__main__':
+    rebuild_index()
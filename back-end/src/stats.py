@@ -0,0 +1,138 @@
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from .database import SessionLocal
+from .models import UserStats, User, Article, Video, Follow, Comment
+
+# 投稿类型对应的计数列
+_TOTAL_COLUMNS = {0: 'article_total', 1: 'video_total'}
+_COLUMNS = ('article_total', 'video_total', 'follower_total', 'unread_reply')
+
+
+def _unread_query(db, model, type: int, uids):
+    ''' 他人在用户投稿下发表的、晚于用户上次查看回复时间的评论数 '''
+    return db.query(model.uid, func.count(Comment.id)).join(
+        Comment, (Comment.type == type) & (Comment.submission_id == model.id)
+    ).join(User, User.uid == model.uid).filter(
+        model.uid.in_(uids), Comment.uid != model.uid, Comment.time > User.remind_after
+    ).group_by(model.uid)
+
+
+def _count(db, uids):
+    ''' 从原始表统计一批用户的计数，返回{uid: {列名: 计数}} '''
+    counts = {uid: dict.fromkeys(_COLUMNS, 0) for uid in uids}
+    for column, query in (
+        ('article_total', db.query(Article.uid, func.count(Article.id)).filter(
+            Article.uid.in_(uids), Article.status == 1).group_by(Article.uid)),
+        ('video_total', db.query(Video.uid, func.count(Video.id)).filter(
+            Video.uid.in_(uids), Video.status == 1).group_by(Video.uid)),
+        ('follower_total', db.query(Follow.uid, func.count(Follow.id)).filter(
+            Follow.uid.in_(uids)).group_by(Follow.uid)),
+        ('unread_reply', _unread_query(db, Article, 0, uids)),
+        ('unread_reply', _unread_query(db, Video, 1, uids)),
+    ):
+        for uid, total in query:
+            counts[uid][column] += total
+    return counts
+
+
+def ensure_stats(db, uid):
+    ''' 返回用户的计数行，不存在时从原始表统计后插入 '''
+    stats = db.get(UserStats, uid)
+    if stats:
+        return stats
+    try:
+        with db.begin_nested():
+            stats = UserStats(uid=uid, **_count(db, [uid])[uid])
+            db.add(stats)
+    except IntegrityError:
+        stats = db.get(UserStats, uid)
+    return stats
+
+
+def _bump(db, uid, column, delta):
+    if not uid or not delta:
+        return
+    updated = db.query(UserStats).filter(UserStats.uid == uid).update(
+        {column: getattr(UserStats, column) + delta}, synchronize_session=False)
+    if not updated:
+        # 调用方已完成变更，首次计数时统计的结果已包含本事务中的变更
+        db.flush()
+        ensure_stats(db, uid)
+
+
+def submission_status_changed(db, type: int, uid: str, old_status: int, new_status: int):
+    ''' 投稿审核状态修改后调用，进入或离开通过状态时调整作者的投稿数 '''
+    if (old_status == 1) == (new_status == 1):
+        return
+    _bump(db, uid, _TOTAL_COLUMNS[type], 1 if new_status == 1 else -1)
+
+
+def submission_deleted(db, type: int, uid: str, status: int):
+    ''' 投稿删除后调用 '''
+    if status == 1:
+        _bump(db, uid, _TOTAL_COLUMNS[type], -1)
+
+
+def follow_changed(db, uid: str, delta: int):
+    ''' 关注或取消关注后调用，uid为被关注的用户 '''
+    _bump(db, uid, 'follower_total', delta)
+
+
+def reply_added(db, owner_uid: str, uid: str):
+    ''' 评论发表后调用，他人的评论使投稿作者的未读回复数加一 '''
+    if owner_uid != uid:
+        _bump(db, owner_uid, 'unread_reply', 1)
+
+
+def reply_removed(db, owner_uid: str, comments):
+    ''' 评论删除后调用，comments为被删除的评论，其中作者尚未查看的部分从未读回复数中扣除 '''
+    remind_after = db.query(User.remind_after).filter(
+        User.uid == owner_uid).scalar() or 0
+    unread = sum(1 for comment in comments
+                 if comment.uid != owner_uid and comment.time > remind_after)
+    _bump(db, owner_uid, 'unread_reply', -unread)
+
+
+def replies_read(db, uid: str):
+    ''' 用户查看回复后调用，在更新remind_after的同一事务中清零未读回复数 '''
+    updated = db.query(UserStats).filter(UserStats.uid == uid).update(
+        {UserStats.unread_reply: 0}, synchronize_session=False)
+    if not updated:
+        db.flush()
+        ensure_stats(db, uid)
+
+
+def reconcile(batch_size=500):
+    ''' 按原始表重新统计所有用户的计数，修复偏差，返回被修正的用户数 '''
+    db = SessionLocal()
+    fixed = 0
+    try:
+        uids = [user.uid for user in db.query(User.uid).order_by(User.uid)]
+        db.commit()
+        for i in range(0, len(uids), batch_size):
+            batch = uids[i:i + batch_size]
+            # 先锁住计数行再统计，避免覆盖统计期间其他事务的增量
+            rows = {stats.uid: stats for stats in db.query(UserStats).filter(
+                UserStats.uid.in_(batch)).with_for_update()}
+            for uid, values in _count(db, batch).items():
+                stats = rows.get(uid)
+                if not stats:
+                    db.add(UserStats(uid=uid, **values))
+                    fixed += 1
+                    continue
+                if any(getattr(stats, column) != value for column, value in values.items()):
+                    for column, value in values.items():
+                        setattr(stats, column, value)
+                    fixed += 1
+            db.commit()
+            db.expunge_all()
+        return fixed
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == '__main__':
+    print(reconcile())
@@ -0,0 +1,58 @@
+from sqlalchemy import desc
+from .database import SessionLocal
+from .models import Submission, Article, Video
+
+# submission表是文章与视频的统一索引，preview对文章为预览文字，对视频为封面
+MODELS = {0: (Article, 'preview'), 1: (Video, 'cover')}
+FEED_KEYS = (Submission.submit_time, Submission.type, Submission.id)
+
+
+def _row(type: int, obj):
+    _, preview = MODELS[type]
+    return Submission(
+        id=obj.id,
+        type=type,
+        uid=obj.uid,
+        status=obj.status,
+        submit_time=obj.submit_time,
+        title=obj.title,
+        preview=getattr(obj, preview),
+        desc=obj.desc,
+    )
+
+
+def sync_submission(db, type: int, obj):
+    ''' 投稿新增或修改后调用，在同一事务中更新submission表中对应的行 '''
+    db.merge(_row(type, obj))
+
+
+def delete_submission(db, type: int, id: str):
+    db.query(Submission).filter(Submission.type == type,
+                                Submission.id == id).delete()
+
+
+def feed(db, *criteria):
+    ''' 按(submit_time, type, id)降序排列的投稿查询，与keyset游标的排序键一致 '''
+    return db.query(Submission).filter(*criteria).order_by(
+        desc(Submission.submit_time), desc(Submission.type), desc(Submission.id))
+
+
+def rebuild_submissions(batch_size=500):
+    ''' 按文章与视频表全量重建submission表，用于初始化或修复 '''
+    db = SessionLocal()
+    try:
+        db.query(Submission).delete()
+        db.commit()
+        for type, (model, _) in MODELS.items():
+            ids = [obj.id for obj in db.query(model.id)]
+            for i in range(0, len(ids), batch_size):
+                for obj in db.query(model).filter(model.id.in_(ids[i:i + batch_size])):
+                    db.add(_row(type, obj))
+                db.commit()
+                db.expunge_all()
+    finally:
+        db.close()
+
+
+if __name__ == '__main__':
+    rebuild_submissions()
@@ -0,0 +1,161 @@
+from sqlalchemy import desc, exists, insert, literal, select
+from .database import SessionLocal, BigIntStr, TimestampDateTime
+from .models import Timeline, Submission, Follow, UserStats
+from .paging import decode_cursor, keyset, count_total
+from .submissions import feed, FEED_KEYS
+from .stats import ensure_stats
+
+# 粉丝数达到该值的作者发布投稿时不写入粉丝的时间线，改为读取时合并
+CELEBRITY_THRESHOLD = 1000
+# 关注时向时间线补充的最近投稿数
+BACKFILL_LIMIT = 100
+TIMELINE_KEYS = (Timeline.submit_time, Timeline.type, Timeline.submission_id)
+COUNT_SCOPES = ('follow', 'article', 'video')
+
+
+def _not_in_timeline(uid, type, submission_id):
+    return ~exists().where(Timeline.uid == uid, Timeline.type == type,
+                           Timeline.submission_id == submission_id)
+
+
+def fan_out(db, type: int, submission):
+    ''' 投稿通过审核后调用，用一条INSERT ... SELECT写入作者所有粉丝的时间线 '''
+    if ensure_stats(db, submission.uid).celebrity:
+        return
+    followers = select(
+        Follow.follower_id,
+        literal(type),
+        literal(submission.id, BigIntStr),
+        literal(submission.uid, BigIntStr),
+        literal(submission.submit_time, TimestampDateTime),
+    ).where(
+        Follow.uid == submission.uid,
+        _not_in_timeline(Follow.follower_id, type, submission.id),
+    ).distinct()
+    db.execute(insert(Timeline).from_select(
+        ['uid', 'type', 'submission_id', 'author_uid', 'submit_time'], followers))
+
+
+def retract(db, type: int, id: str):
+    ''' 投稿被删除或不再处于通过状态时调用，从所有时间线中移除 '''
+    db.query(Timeline).filter(Timeline.type == type,
+                              Timeline.submission_id == id).delete()
+
+
+def submission_status_changed(db, type: int, submission, old_status: int):
+    ''' 投稿审核状态修改后调用 '''
+    if old_status != 1 and submission.status == 1:
+        fan_out(db, type, submission)
+    elif old_status == 1 and submission.status != 1:
+        retract(db, type, submission.id)
+
+
+def recent_posts(author_uid: str, uid: str):
+    ''' 作者最近的、尚未在关注者时间线中的投稿，用于关注时补充时间线 '''
+    return select(
+        literal(uid, BigIntStr),
+        Submission.type,
+        Submission.id,
+        Submission.uid,
+        Submission.submit_time,
+    ).where(
+        Submission.uid == author_uid,
+        Submission.status == 1,
+        _not_in_timeline(uid, Submission.type, Submission.id),
+    ).order_by(desc(Submission.submit_time)).limit(BACKFILL_LIMIT)
+
+
+def _backfill(db, author_uid: str, uid: str):
+    recent = recent_posts(author_uid, uid)
+    db.execute(insert(Timeline).from_select(
+        ['uid', 'type', 'submission_id', 'author_uid', 'submit_time'], recent))
+
+
+def followed(db, author_uid: str, uid: str):
+    '''
+    关注后调用（需在更新粉丝数之后），将作者最近的投稿补充到关注者的时间线。
+    粉丝数达到CELEBRITY_THRESHOLD时将作者标记为大V，此后其投稿在读取时合并
+    '''
+    stats = ensure_stats(db, author_uid)
+    if stats.celebrity:
+        return
+    if stats.follower_total >= CELEBRITY_THRESHOLD:
+        stats.celebrity = True
+        return
+    _backfill(db, author_uid, uid)
+
+
+def author_entries(db, author_uid: str, uid: str):
+    return db.query(Timeline).filter(Timeline.uid == uid, Timeline.author_uid == author_uid)
+
+
+def unfollowed(db, author_uid: str, uid: str):
+    ''' 取消关注后调用，从时间线中移除该作者的投稿 '''
+    author_entries(db, author_uid, uid).delete()
+
+
+def timeline_query(db, uid: str, celebrities):
+    timeline = db.query(Submission).join(
+        Timeline, (Timeline.type == Submission.type) & (
+            Timeline.submission_id == Submission.id)
+    ).filter(Timeline.uid == uid, Submission.status == 1)
+    if celebrities:
+        # 成为大V之前写入时间线的投稿由合并查询返回
+        timeline = timeline.filter(Timeline.author_uid.notin_(celebrities))
+    return timeline.order_by(*[desc(key) for key in TIMELINE_KEYS])
+
+
+def celebrity_feed(db, celebrities):
+    return feed(db, Submission.status == 1, Submission.uid.in_(celebrities))
+
+
+def followed_feed(db, uid: str, data):
+    '''
+    关注的作者的投稿，返回(当前页, 是否还有下一页, 总数, 总数是否达到上限)。普通作者的投稿来自时间线，
+    大V的投稿按作者查询submission表后与时间线按(submit_time, type, id)归并
+    '''
+    celebrities = [row.uid for row in db.query(Follow.uid).join(
+        UserStats, UserStats.uid == Follow.uid).filter(
+        Follow.follower_id == uid, UserStats.celebrity == True).distinct()]
+    sources = [(timeline_query(db, uid, celebrities), TIMELINE_KEYS)]
+    if celebrities:
+        sources.append((celebrity_feed(db, celebrities), FEED_KEYS))
+    totals = [count_total(db, query, data, COUNT_SCOPES) for query, _ in sources]
+    total = sum(total for total, _ in totals) if data.withTotal else None
+    capped = any(capped for _, capped in totals)
+    cursor = decode_cursor(data.cursor)
+    rows = []
+    for query, keys in sources:
+        if cursor:
+            query = query.filter(keyset(cursor, *keys)).limit(data.pageSize + 1)
+        else:
+            query = query.limit(data.pageNum * data.pageSize + 1)
+        rows.extend(query.all())
+    rows.sort(key=lambda obj: (obj.submit_time, obj.type, int(obj.id)), reverse=True)
+    if not cursor:
+        rows = rows[(data.pageNum - 1) * data.pageSize:]
+    return rows[:data.pageSize], len(rows) > data.pageSize, total, capped
+
+
+def rebuild_timelines(batch_size=500):
+    ''' 按粉丝数重新标记大V，并按关注关系全量重建时间线，用于初始化或修复 '''
+    db = SessionLocal()
+    try:
+        db.query(UserStats).update({UserStats.celebrity: (
+            UserStats.follower_total >= CELEBRITY_THRESHOLD)}, synchronize_session=False)
+        db.query(Timeline).delete()
+        db.commit()
+        celebrities = {row.uid for row in db.query(
+            UserStats.uid).filter(UserStats.celebrity == True)}
+        follows = db.query(Follow.uid, Follow.follower_id).distinct().all()
+        for i in range(0, len(follows), batch_size):
+            for follow in follows[i:i + batch_size]:
+                if follow.uid not in celebrities:
+                    _backfill(db, follow.uid, follow.follower_id)
+            db.commit()
+    finally:
+        db.close()
+
+
+if __name__ == '__main__':
+    rebuild_timelines()
@@ -1,37 +1,18 @@
-import requests
-import json
-import ssl
-from urllib.parse import quote_plus
-from urllib.parse import urlencode
-from urllib.error import URLError
-from urllib.request import Request
-from urllib.request import urlopen
-import base64
 from datetime import datetime
-from .database import SessionLocal
-from .models import Config, Token, User, Article, Video
+from .database import SessionLocal, run_db
+from .models import Token, User
+from .cache import TTLCache
+from . import queries
+from .config import UPLOAD_CHUNK_SIZE
 import hashlib
 import secrets
 import re
-import smtplib
 import random
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from fastapi import UploadFile, File
+from fastapi import UploadFile
+from starlette.concurrency import run_in_threadpool
 import uuid
 import os
 
-db = SessionLocal()
-config = db.query(Config).first()
-SMTP_SERVER = config.smtp_server
-SMTP_PORT = config.smtp_port
-SENDER_EMAIL = config.sender_email
-SENDER_PASSWORD = config.sender_password
-API_KEY = config.api_key
-SECRET_KEY = config.secret_key
-db.close()
-
-
 def error(msg='SERVER_ERROR'):
     return {'success': False, 'data': {'error': msg}}
 
@@ -65,170 +46,162 @@ def generate_code():
     return ''.join(random.choice('ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789') for _ in range(6))
 
 
-def send_code(code: str, email: str, lang: str):
-    server = smtplib.SMTP(SMTP_SERVER, SMTP_PORT)
-    server.login(SENDER_EMAIL, SENDER_PASSWORD)
-
-    message = MIMEMultipart()
-    message['From'] = 'Egaku@egaku.com'
-    message['To'] = email
-    if lang == 'zh-Hans':
-        message['Subject'] = '验证码'
-        message.attach(MIMEText(f'''
-            <!DOCTYPE html>
-            <html lang="zh-Hans">
-            <head>
-                <meta charset="UTF-8">
-                <meta name="viewport" content="width=device-width, initial-scale=1.0">
-                <title>Egaku</title>
-            </head>
-            <body>
-                <h3>Egaku</h3>
-                <p>您的验证码是：</p>
-                <h1>{code}</h1>
-                <p>有效时间为<b>5分钟</b>。请勿将其泄露给他人。如果您未进行过相关操作，请忽略。</p>
-                <p>谢谢！</p>
-            </body>
-            </html>
-        ''', 'html'))
-    elif lang == 'zh-Hant':
-        message['Subject'] = '驗證碼'
-        message.attach(MIMEText(f'''
-            <!DOCTYPE html>
-            <html lang="zh-Hant">
-            <head>
-                <meta charset="UTF-8">
-                <meta name="viewport" content="width=device-width, initial-scale=1.0">
-                <title>Egaku</title>
-            </head>
-            <body>
-                <h3>Egaku</h3>
-                <p>您的驗證碼是：</p>
-                <h1>{code}</h1>
-                <p>有效時間為<b>5分鐘</b>。請勿將其洩露給他人。如果您未進行過相關操作，請忽略。</p>
-                <p>謝謝！</p>
-            </body>
-            </html>
-        ''', 'html'))
-    elif lang == 'ja':
-        message['Subject'] = '認証コード'
-        message.attach(MIMEText(f'''
-            <!DOCTYPE html>
-            <html lang="ja">
-            <head>
-                <meta charset="UTF-8">
-                <meta name="viewport" content="width=device-width, initial-scale=1.0">
-                <title>Egaku</title>
-            </head>
-            <body>
-                <h3>Egaku</h3>
-                <p>あなたの認証コードは：</p>
-                <h1>{code}</h1>
-                <p>有効時間は<b>5分</b>です。他人に漏らさないでください。関連する操作を行ったことがない場合は、無視してください。</p>
-                <p>ありがとうございます。</p>
-            </body>
-            </html>
-        ''', 'html'))
-    else:
-        message['Subject'] = 'Verification Code'
-        message.attach(MIMEText(f'''
-            <!DOCTYPE html>
-            <html lang="en">
-            <head>
-                <meta charset="UTF-8">
-                <meta name="viewport" content="width=device-width, initial-scale=1.0">
-                <title>Egaku</title>
-            </head>
-            <body>
-                <h3>Egaku</h3>
-                <p>Your verification code is:</p>
-                <h1>{code}</h1>
-                <p>The effective time is <b>5 minutes</b>. Please do not disclose it to others. If you have not performed the relevant operation, please ignore it.</p>
-                <p>Thanks!</p>
-            </body>
-            </html>
-        ''', 'html'))
-
-    server.sendmail(SENDER_EMAIL, email, message.as_string())
-    server.quit()
+TOKEN_LIFETIME = 60 * 60 * 1000
+TOKEN_WRITE_BEHIND = 10 * 60 * 1000
+_token_cache = TTLCache(maxsize=10000, ttl=60)
 
 
-def verify_token(token: str):
+def _load_token(token: str):
     db = SessionLocal()
-    token_obj = db.query(Token).filter(Token.token == token).order_by(
-        Token.expire_time.desc()).first()
-    if token_obj:
-        if token_obj.expire_time < time():
-            db.close()
-            return False
-        token_obj.expire_time = time() + 60 * 60 * 1000
-        uid = token_obj.uid
-        db.commit()
-        return uid
-    db.close()
-    return False
-
-
-async def save_file(file: UploadFile = File(..., max_size=1024*1024*1024)):
-    BASE_URL = 'http://localhost:8000'
-
-    file_ext = file.filename.split('.')[-1]
-    filename = f'{uuid.uuid4().hex}.{file_ext}'
-    if not os.path.exists('uploads'):
-        os.makedirs('uploads')
-    file_path = os.path.join('uploads', filename)
-    with open(file_path, 'wb') as buffer:
-        while chunk := await file.read(1024 * 1024):
-            buffer.write(chunk)
-    return f'{BASE_URL}/files/{filename}'
+    try:
+        token_obj = queries.token_by_value(db, token).first()
+        if not token_obj or token_obj.expire_time < time():
+            return None
+        return {
+            'uid': token_obj.uid,
+            'expire': token_obj.expire_time,
+            'stored': token_obj.expire_time,
+            'version': queries.token_version(db, token_obj.uid).scalar(),
+        }
+    finally:
+        db.close()
+
+
+def _token_revoked(entry: dict):
+    ''' 缓存的token所属用户的token是否已被其他进程（或本进程）删除 '''
+    db = SessionLocal()
+    try:
+        return queries.token_version(db, entry['uid']).scalar() != entry['version']
+    finally:
+        db.close()
 
 
-def exp_plus(uid: str, exp: int):
+def _store_token_expire(token: str, entry: dict):
     db = SessionLocal()
-    user = db.query(User).filter(User.uid == uid).first()
-    user.exp = user.exp + exp
-    db.commit()
+    try:
+        expire = entry['expire']
+        db.query(Token).filter(Token.token == token).update(
+            {Token.expire_time: expire})
+        db.commit()
+        entry['stored'] = expire
+    finally:
+        db.close()
+
+
+def verify_token(token: str):
+    '''
+    校验token并返回uid，结果在内存中缓存。命中缓存时按主键比对用户的token_version，
+    其他进程删除了该用户的token时立即失效。每次访问在内存中顺延有效期，
+    仅当内存中的有效期领先数据库超过TOKEN_WRITE_BEHIND时才写回数据库
+    '''
+    if not token:
+        return False
+    entry = _token_cache.get(token)
+    if entry is not None and _token_revoked(entry):
+        _token_cache.pop(token)
+        return False
+    if entry is None:
+        entry = _load_token(token)
+        if entry is None:
+            return False
+        _token_cache.set(token, entry)
+    now = time()
+    if entry['expire'] < now:
+        _token_cache.pop(token)
+        return False
+    entry['expire'] = now + TOKEN_LIFETIME
+    if entry['expire'] - entry['stored'] > TOKEN_WRITE_BEHIND:
+        _store_token_expire(token, entry)
+    return entry['uid']
 
 
-ssl._create_default_https_context = ssl._create_unverified_context
-TEXT_CENSOR = 'https://aip.baidubce.com/rest/2.0/solution/v1/text_censor/v2/user_defined'
-VIDEO_CENSOR = 'https://aip.baidubce.com/rest/2.0/solution/v1/video_censor/v1/video/submit'
+async def verify_token_async(token: str):
+    ''' verify_token的异步版本，通过run_db访问数据库，不阻塞事件循环 '''
+    if not token:
+        return False
+    return await run_db(verify_token, token)
 
 
-def _fetch_review_token():
-    TOKEN_URL = 'https://aip.baidubce.com/oauth/2.0/token'
-    params = {
-        'grant_type': 'client_credentials',
-        'client_id': API_KEY,
-        'client_secret': SECRET_KEY
-    }
-    post_data = urlencode(params).encode('utf-8')
-    req = Request(TOKEN_URL, post_data)
-    try:
-        f = urlopen(req, timeout=5)
-        result_str = f.read()
-    except URLError as err:
-        print(err)
-    result_str = result_str.decode()
-    result = json.loads(result_str)
-    if ('access_token' in result.keys() and 'scope' in result.keys()):
-        if not 'brain_all_scope' in result['scope'].split(' '):
-            print('please ensure has check the ability')
-            return
-        return result['access_token']
-    else:
-        print('please overwrite the correct API_KEY and SECRET_KEY')
-        return
-
-
-def _request(url, data):
-    req = Request(url, data.encode('utf-8'))
+def revoke_tokens(db, uid: str):
+    ''' 删除用户的全部token并递增token_version，由调用方提交事务，提交后再调用invalidate_tokens '''
+    queries.user_tokens(db, uid).delete()
+    db.query(User).filter(User.uid == uid).update(
+        {User.token_version: User.token_version + 1})
+
+
+def invalidate_tokens(uid: str):
+    ''' revoke_tokens提交后调用，立即清除本进程缓存；其他进程在下次命中时比对token_version后失效 '''
+    _token_cache.discard_if(lambda token, entry: entry['uid'] == uid)
+
+
+BASE_URL = 'http://localhost:8000'
+UPLOAD_DIR = 'uploads'
+
+
+def _file_ext(filename: str):
+    ext = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+    return f'.{ext}' if ext.isalnum() and len(ext) <= 10 else ''
+
+
+def _stored_path(url: str):
+    prefix = f'{BASE_URL}/files/'
+    return os.path.join(UPLOAD_DIR, url[len(prefix):]) if url.startswith(prefix) else None
+
+
+def _open_tmp_file():
+    tmp_dir = os.path.join(UPLOAD_DIR, 'tmp')
+    os.makedirs(tmp_dir, exist_ok=True)
+    tmp_path = os.path.join(tmp_dir, uuid.uuid4().hex)
+    return tmp_path, open(tmp_path, 'wb')
+
+
+def _write_chunk(buffer, sha256, chunk: bytes):
+    sha256.update(chunk)
+    buffer.write(chunk)
+
+
+def _store_file(db, tmp_path: str, digest: str, filename: str):
+    ''' 已有相同哈希的文件时返回其地址，否则把临时文件移动到按哈希分片的位置 '''
+    for (url,) in queries.files_by_hash(db, digest):
+        path = _stored_path(url)
+        if path and os.path.exists(path):
+            return url
+    filename = f'{digest[:2]}/{digest[2:4]}/{digest}{_file_ext(filename)}'
+    path = os.path.join(UPLOAD_DIR, filename)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # 内容相同，并发上传同一文件时覆盖也无妨
+    os.replace(tmp_path, path)
+    return f'{BASE_URL}/files/{filename}'
+
+
+def _discard_tmp_file(buffer, tmp_path: str):
+    buffer.close()
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+
+async def save_file(file: UploadFile, db):
+    '''
+    边写入临时文件边计算sha256，按哈希存放在uploads/ab/cd/<hash>.<ext>，两级子目录避免单个目录文件过多。
+    uploaded_file表中已有相同哈希的文件时删除临时文件，复用已有的地址。返回(url, hash)。
+    磁盘读写与哈希计算在线程池中执行，数据库查询通过run_db执行，大文件上传不会阻塞事件循环
+    '''
+    tmp_path, buffer = await run_in_threadpool(_open_tmp_file)
+    sha256 = hashlib.sha256()
     try:
-        f = urlopen(req)
-        result_str = f.read().decode()
-        return json.loads(result_str)
-    except URLError as err:
-        print(err)
+        while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+            await run_in_threadpool(_write_chunk, buffer, sha256, chunk)
+        await run_in_threadpool(buffer.close)
+        digest = sha256.hexdigest()
+        url = await run_db(_store_file, db, tmp_path, digest, file.filename)
+        return url, digest
+    finally:
+        await run_in_threadpool(_discard_tmp_file, buffer, tmp_path)
+
+
+def exp_plus(db, uid: str, exp: int):
+    ''' 在调用方的事务中增加经验值，由调用方提交事务 '''
+    db.query(User).filter(User.uid == uid).update({User.exp: User.exp + exp})
 
 
 def _read_file(path):
@@ -242,73 +215,3 @@ def _read_file(path):
     finally:
         if f:
             f.close()
-
-
-_token = _fetch_review_token()
-
-
-def review(content: str, type: int, id: str, uid: str):
-    db = SessionLocal()
-    if type == 0:
-        text_url = TEXT_CENSOR + "?access_token=" + _token
-        result = _request(text_url, urlencode({'text': content}))
-        print(result)
-        article = db.query(Article).filter(Article.id == id).first()
-        if result['conclusion'] == '合规':
-            article.status = 1
-            db.commit()
-            exp_plus(uid, 20)
-        else:
-            article.status = 2
-            article.desc = '; '.join(
-                list(map(lambda obj: obj['msg'], result['data'])))
-            db.commit()
-    elif type == 1:
-        pass
-        # video_url = VIDEO_URL + "?access_token=" + _token
-        # TODO 缺失存储视频的网络服务器，无法AI审核视频
-        # result = {'conslusion': '合规'}
-        # print(result)
-        # video = db.query(Video).filter(Video.id == id).first()
-        # if result['conclusion'] == '合规':
-        #     video.status = 1
-        #     db.commit()
-        #     exp_plus(uid, 20)
-        # else:
-        #     video.status = 2
-        #     video.desc = '; '.join(
-        #         list(map(lambda obj: obj['msg'], result['data'])))
-        #     db.commit()
-    db.close()
-
-
-NEWS_SUMMARY = 'https://aip.baidubce.com/rpc/2.0/nlp/v1/news_summary'
-
-
-def summary(title: str, content: str):
-    url = NEWS_SUMMARY + '?charset=UTF-8&access_token=' + _token
-    result = requests.post(url, data=json.dumps({
-        'title': title,
-        'content': content,
-        'max_summary_len': 200,
-    }), headers={'Content-Type': 'application/json'}).json()
-    print(result)
-    return result['summary']
-
-
-def ai_image_procssing(image: str, api: str):
-    APIS = {
-        'coloring': 'https://aip.baidubce.com/rest/2.0/image-process/v1/colourize',
-        'animization': 'https://aip.baidubce.com/rest/2.0/image-process/v1/selfie_anime',
-        'defogging': 'https://aip.baidubce.com/rest/2.0/image-process/v1/dehaze',
-        'contrast': 'https://aip.baidubce.com/rest/2.0/image-process/v1/contrast_enhance',
-        'scale': 'https://aip.baidubce.com/rest/2.0/image-process/v1/image_quality_enhance',
-        'restore': 'https://aip.baidubce.com/rest/2.0/image-process/v1/stretch_restore',
-        'definition': 'https://aip.baidubce.com/rest/2.0/image-process/v1/image_definition_enhance',
-        'colorEnhance': 'https://aip.baidubce.com/rest/2.0/image-process/v1/color_enhance',
-    }
-    url = APIS[api] + '?access_token=' + _token
-    result = requests.post(url, data={'image': image}, headers={
-                           'Content-Type': 'application/x-www-form-urlencoded'}).json()
-    print(result)
-    return result['image']
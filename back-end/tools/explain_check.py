@@ -0,0 +1,97 @@
+'''
+对apis.py中各接口的主要查询执行EXPLAIN，检查是否存在全表扫描。
+在back-end目录下运行：python -m tools.explain_check，存在全表扫描时退出码为1
+'''
+import sys
+from src.database import SessionLocal, engine
+from src.models import *
+from src import queries, utils
+from src.hydration import submissions_query
+from src.moderation import due_tasks
+from src.search import match_query, posting_floor
+from src.timeline import timeline_query, celebrity_feed, recent_posts, author_entries
+
+UID = '1'
+ID = '1'
+NOW = utils.time()
+PAGE = 21
+# 允许全表扫描的表（只有一行的配置表）
+ALLOWED_SCANS = {'config'}
+
+
+def route_queries(db):
+    '''
+    各接口的主要查询，与接口调用同一个函数构造，检查的就是实际执行的SQL。
+    按条件删除的接口检查其条件相同的查询，翻页接口检查第一页
+    '''
+    return {
+        'verify_token': queries.token_by_value(db, 'x').limit(1),
+        'verify_token (revocation)': queries.token_version(db, UID),
+        'user/login (account)': queries.user_by_login(db, 'x').limit(1),
+        'user/login (email)': queries.user_by_login(db, 'x@x').limit(1),
+        'user/signup': queries.latest_verification(db, 'x').limit(1),
+        'user/reset': queries.user_tokens(db, UID),
+        'user/getInfo': queries.user_with_stats(db, UID).limit(1),
+        'user/getSubmission': queries.user_submissions(db, UID).limit(PAGE),
+        'user/getSubmissionPreview': queries.user_submissions(db, UID, published=True).limit(PAGE),
+        'user/getFollowedSubmission': timeline_query(db, UID, []).limit(PAGE),
+        'user/getFollowedSubmission (celebrities)': timeline_query(db, UID, [ID]).limit(PAGE),
+        'user/getFollowedSubmission (merged)': celebrity_feed(db, [ID, '2']).limit(PAGE),
+        'user/follow': recent_posts(ID, UID),
+        'user/followCancel': author_entries(db, ID, UID),
+        'user/getSubmissionNeedReview': queries.submissions_need_review(db).limit(PAGE),
+        'article/getAll': queries.public_articles(db).limit(PAGE),
+        'video/getAll': queries.public_videos(db).limit(PAGE),
+        'article/get': db.query(Article).filter(Article.id == ID),
+        'uploadFile': queries.files_by_hash(db, '0' * 64),
+        'article/getContent': queries.article_content(db, ID).limit(1),
+        'user/getCollection': queries.user_collections(db, UID).limit(PAGE),
+        'user/isCollected': queries.user_collection(db, UID, 0, ID).limit(1),
+        'user/delCollection': queries.submission_collections(db, 0, ID),
+        'user/getComment': queries.submission_comments(db, 0, ID).limit(PAGE),
+        'user/getReply': queries.user_replies(db, UID).limit(PAGE),
+        'user/isFollowed': queries.follow_relation(db, ID, UID).limit(1),
+        'user/getFollowed': queries.user_follows(db, UID).limit(PAGE),
+        'user/getDetailInfo': db.query(UserStats).filter(UserStats.uid == UID),
+        'common/search': match_query(db, ['x', 'y'])[0],
+        'search index pruning': posting_floor(db, 'x'),
+        'load_submissions': submissions_query(db, {0: {ID, '2'}, 1: {ID}}),
+        'review worker': due_tasks(db, NOW).limit(1),
+    }
+
+
+def _full_scans(db, sql):
+    ''' 返回执行计划中被全表扫描的表 '''
+    dialect = engine.dialect.name
+    if dialect == 'mysql':
+        rows = db.connection().exec_driver_sql('EXPLAIN ' + sql).mappings().all()
+        return [row['table'] for row in rows
+                if row['type'] == 'ALL' and not row['table'].startswith('<')]
+    if dialect == 'sqlite':
+        rows = db.connection().exec_driver_sql('EXPLAIN QUERY PLAN ' + sql).all()
+        return [row[3].split()[1] for row in rows
+                if row[3].startswith('SCAN ') and ' USING ' not in row[3]
+                and not row[3].startswith(('SCAN CONSTANT', 'SCAN (subquery', 'SCAN UNION'))]
+    raise RuntimeError('UNSUPPORTED_DIALECT', dialect)
+
+
+def check():
+    db = SessionLocal()
+    failed = []
+    try:
+        for route, query in route_queries(db).items():
+            statement = getattr(query, 'statement', query)
+            sql = str(statement.compile(
+                dialect=engine.dialect, compile_kwargs={'literal_binds': True}))
+            scans = [table for table in _full_scans(db, sql)
+                     if table not in ALLOWED_SCANS]
+            print(f"{'FULL SCAN' if scans else 'ok':10}{route} {' '.join(scans)}")
+            if scans:
+                failed.append(route)
+    finally:
+        db.close()
+    return failed
+
+
+if __name__ == '__main__':
+    sys.exit(1 if check() else 0)
@@ -0,0 +1,93 @@
+'''
+邮件发送吞吐量测试：在本机启动aiosmtpd作为SMTP服务器，分别以每封邮件新建一次连接（原来的发送方式）
+与MailDispatcher的常驻连接发送N封验证码邮件，输出每秒发送的邮件数。
+需要先安装aiosmtpd（pip install aiosmtpd），在back-end目录下运行：
+python -m tools.mail_bench [--messages 500] [--workers 2]
+'''
+import sys
+import time
+import socket
+import smtplib
+import argparse
+import threading
+from src.mail import MailDispatcher, build_code_message
+
+try:
+    from aiosmtpd.controller import Controller
+except ImportError:
+    raise SystemExit('mail_bench需要aiosmtpd：pip install aiosmtpd')
+
+SENDER = 'bench@egaku.com'
+RECIPIENT = 'user@egaku.com'
+
+
+class _CountingHandler:
+    ''' 只计数不保存的SMTP处理器 '''
+
+    def __init__(self):
+        self.received = 0
+        self._lock = threading.Lock()
+
+    async def handle_DATA(self, server, session, envelope):
+        with self._lock:
+            self.received += 1
+        return '250 OK'
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _per_message(port, messages):
+    ''' 每封邮件新建连接发送 '''
+    for _ in range(messages):
+        server = smtplib.SMTP('127.0.0.1', port, timeout=30)
+        server.sendmail(SENDER, RECIPIENT, build_code_message('123456', RECIPIENT, 'en').as_string())
+        server.quit()
+
+
+def _dispatcher(port, messages, workers):
+    dispatcher = MailDispatcher(settings=lambda: ('127.0.0.1', port, SENDER, None), workers=workers)
+    dispatcher.start()
+    try:
+        for _ in range(messages):
+            dispatcher.send(RECIPIENT, build_code_message('123456', RECIPIENT, 'en'))
+        dispatcher.join()
+    finally:
+        dispatcher.stop()
+    return dispatcher.failed
+
+
+def _measure(name, handler, messages, run):
+    before = handler.received
+    start = time.perf_counter()
+    failed = run()
+    elapsed = time.perf_counter() - start
+    received = handler.received - before
+    print(f'{name:<16} {messages / elapsed:8.1f} msg/s '
+          f'received={received} failed={failed or 0}')
+    return received == messages
+
+
+def main(args):
+    handler = _CountingHandler()
+    port = _free_port()
+    controller = Controller(handler, hostname='127.0.0.1', port=port)
+    controller.start()
+    try:
+        ok = _measure('per message', handler, args.messages,
+                      lambda: _per_message(port, args.messages))
+        ok = _measure(f'dispatcher x{args.workers}', handler, args.messages,
+                      lambda: _dispatcher(port, args.messages, args.workers)) and ok
+    finally:
+        controller.stop()
+    return ok
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--messages', type=int, default=500, help='发送的邮件数')
+    parser.add_argument('--workers', type=int, default=2, help='MailDispatcher的发送线程数')
+    sys.exit(0 if main(parser.parse_args()) else 1)
@@ -0,0 +1,90 @@
+'''
+/files吞吐量测试：在同一个uvicorn进程中分别挂载原来的StaticFiles与MediaFiles，
+对同一个文件做并发整文件下载与随机Range读取（模拟视频拖动），输出两者的吞吐量。
+在back-end目录下运行：python -m tools.media_bench [--size 256] [--concurrency 8] [--requests 32]
+'''
+import os
+import time
+import random
+import socket
+import asyncio
+import argparse
+import tempfile
+import threading
+import httpx
+import uvicorn
+from starlette.applications import Starlette
+from starlette.routing import Mount
+from starlette.staticfiles import StaticFiles
+from src.media import MediaFiles
+
+RANGE_SIZE = 1024 * 1024
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _serve(directory: str, port: int):
+    app = Starlette(routes=[
+        Mount('/static', StaticFiles(directory=directory)),
+        Mount('/media', MediaFiles(directory=directory)),
+    ])
+    server = uvicorn.Server(uvicorn.Config(app, port=port, log_level='warning'))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+async def _run(client, url, requests, concurrency, size, ranged):
+    semaphore = asyncio.Semaphore(concurrency)
+    received = 0
+
+    async def fetch():
+        nonlocal received
+        headers = {}
+        if ranged:
+            start = random.randrange(0, max(size - RANGE_SIZE, 1))
+            headers['Range'] = f'bytes={start}-{start + RANGE_SIZE - 1}'
+        async with semaphore:
+            async with client.stream('GET', url, headers=headers) as response:
+                async for chunk in response.aiter_raw():
+                    received += len(chunk)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[fetch() for _ in range(requests)])
+    elapsed = time.perf_counter() - start
+    return received / elapsed / 1024 / 1024, requests / elapsed
+
+
+async def main(args):
+    with tempfile.TemporaryDirectory() as directory:
+        size = args.size * 1024 * 1024
+        with open(os.path.join(directory, 'bench.mp4'), 'wb') as f:
+            for _ in range(args.size):
+                f.write(os.urandom(1024 * 1024))
+        port = _free_port()
+        server = _serve(directory, port)
+        try:
+            async with httpx.AsyncClient(timeout=None) as client:
+                for ranged in (False, True):
+                    name = 'range 1MB' if ranged else 'full file'
+                    requests = args.requests * (16 if ranged else 1)
+                    for mount in ('static', 'media'):
+                        url = f'http://127.0.0.1:{port}/{mount}/bench.mp4'
+                        await _run(client, url, 2, 2, size, ranged)
+                        mbps, rps = await _run(client, url, requests, args.concurrency, size, ranged)
+                        print(f'{name:<10} {mount:<7} {mbps:8.0f} MB/s {rps:8.1f} req/s')
+        finally:
+            server.should_exit = True
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--size', type=int, default=256, help='测试文件大小（MB）')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=32, help='整文件下载次数，Range读取为其16倍')
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,92 @@
+'''
+上传并发测试：在若干个大文件并行上传的同时持续请求一个轻量接口，输出轻量接口的延迟分位数，
+用于确认上传不会阻塞事件循环。先单独测一次基线，再在上传期间测一次，两者应接近。
+在back-end目录下对运行中的服务执行：
+python -m tools.upload_bench --token <token> [--uploads 4] [--size 1024] [--url http://localhost:8000]
+'''
+import os
+import sys
+import time
+import asyncio
+import argparse
+import statistics
+import httpx
+
+CHUNK = 1024 * 1024
+
+
+class _GeneratedFile:
+    ''' 按需生成内容的文件对象，避免在测试端占用与上传大小相同的内存 '''
+
+    def __init__(self, size: int):
+        self.remaining = size
+        self.block = os.urandom(CHUNK)
+
+    def read(self, size=-1):
+        size = CHUNK if size is None or size < 0 else min(size, CHUNK)
+        size = min(size, self.remaining)
+        self.remaining -= size
+        return self.block[:size]
+
+
+async def _upload(client, url, token, size):
+    files = {'file': ('bench.bin', _GeneratedFile(size), 'application/octet-stream')}
+    start = time.perf_counter()
+    response = await client.post(f'{url}/api/uploadFile', files=files,
+                                 headers={'token': token}, timeout=None)
+    return time.perf_counter() - start, response.json()
+
+
+async def _probe(client, url, path, stop, interval):
+    latencies = []
+    while not stop.is_set():
+        start = time.perf_counter()
+        await client.get(f'{url}{path}')
+        latencies.append(time.perf_counter() - start)
+        await asyncio.sleep(interval)
+    return latencies
+
+
+def _report(name, latencies):
+    latencies = sorted(latencies)
+    if not latencies:
+        print(f'{name:<10} no samples')
+        return
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(f'{name:<10} n={len(latencies):<5} p50={statistics.median(latencies) * 1000:.1f}ms '
+          f'p99={p99 * 1000:.1f}ms max={latencies[-1] * 1000:.1f}ms')
+
+
+async def main(args):
+    size = args.size * 1024 * 1024
+    limits = httpx.Limits(max_connections=args.uploads + 4)
+    async with httpx.AsyncClient(limits=limits, timeout=30) as client:
+        stop = asyncio.Event()
+        probe = asyncio.create_task(_probe(client, args.url, args.path, stop, args.interval))
+        await asyncio.sleep(args.baseline)
+        stop.set()
+        _report('baseline', await probe)
+
+        stop = asyncio.Event()
+        probe = asyncio.create_task(_probe(client, args.url, args.path, stop, args.interval))
+        results = await asyncio.gather(*[_upload(client, args.url, args.token, size)
+                                         for _ in range(args.uploads)])
+        stop.set()
+        _report('uploading', await probe)
+        for elapsed, result in results:
+            print(f'upload     {args.size}MB in {elapsed:.1f}s '
+                  f'({args.size / elapsed:.0f}MB/s) success={result["success"]}')
+        return all(result['success'] for _, result in results)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--url', default='http://localhost:8000')
+    parser.add_argument('--token', required=True)
+    parser.add_argument('--uploads', type=int, default=4, help='并行上传数')
+    parser.add_argument('--size', type=int, default=1024, help='每个文件的大小（MB）')
+    parser.add_argument('--path', default='/api/article/getAll?pageSize=1',
+                        help='测量延迟的轻量接口')
+    parser.add_argument('--interval', type=float, default=0.05)
+    parser.add_argument('--baseline', type=float, default=5, help='基线测量时长（秒）')
+    sys.exit(0 if asyncio.run(main(parser.parse_args())) else 1)
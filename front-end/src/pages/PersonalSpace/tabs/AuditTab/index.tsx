@@ -8,6 +8,7 @@ import {
   getSubmissionNeedReview,
   updSubmission,
 } from '../../../../services/user';
+import { getContent } from '../../../../services/article';
 import ErrorNotification from '../../../../components/ErrorNotification';
 import type { IErrorNotification } from '../../../../components/ErrorNotification';
 import SuccessMessage from '../../../../components/SuccessMessage';
@@ -67,6 +68,27 @@ export default function AuditTab() {
     },
   });
 
+  // 列表中不包含文章正文，打开时再按需加载
+  const { run: contentRun, loading: contentLoading } = useRequest(getContent, {
+    manual: true,
+    onSuccess(data) {
+      if (data.success) {
+        setArticleContent(
+          convertFromRaw(
+            JSON.parse(data.data.content) as RawDraftContentState
+          ).getPlainText()
+        );
+      } else {
+        setOpen(false);
+        errorRef.current!.open(data.data.error);
+      }
+    },
+    onError(err) {
+      setOpen(false);
+      errorRef.current!.open(err);
+    },
+  });
+
   const columns: TableProps<SubmissionObj>['columns'] = useMemo(
     () => [
       {
@@ -77,7 +99,7 @@ export default function AuditTab() {
       {
         title: t('personal.audit.content'),
         key: 'content',
-        render(_, { title, content, preview, cover, video }) {
+        render(_, { id, title, preview, cover, video }) {
           if (video) {
             return (
               <Image
@@ -93,17 +115,14 @@ export default function AuditTab() {
               />
             );
           } else {
-            const text = convertFromRaw(
-              JSON.parse(content!) as RawDraftContentState
-            ).getPlainText();
-
             return (
               <a
                 onClick={(e) => {
                   e.preventDefault();
                   setArticleTitle(title);
-                  setArticleContent(text);
+                  setArticleContent('');
                   setOpen(true);
+                  contentRun({ id });
                 }}
               >
                 {preview!.length > 50
@@ -195,7 +214,7 @@ export default function AuditTab() {
         },
       },
     ],
-    [reason, statusText, t, updLoading, updRun]
+    [contentRun, reason, statusText, t, updLoading, updRun]
   );
 
   return (
@@ -206,7 +225,7 @@ export default function AuditTab() {
         open={open}
         onCancel={() => setOpen(false)}
       >
-        {articleContent}
+        {contentLoading ? <LoadingOutlined /> : articleContent}
       </Modal>
       <ErrorNotification ref={errorRef} />
       <SuccessMessage ref={successRef} />
@@ -228,7 +247,7 @@ export default function AuditTab() {
           simple: true,
           size: 'small',
           showTotal(total, range) {
-            return `${range[0]}-${range[1]} / ${total}`;
+            return `${range[0]}-${range[1]} / ${total}${data?.data.totalCapped ? '+' : ''}`;
           },
           onChange(pageNum, pageSize) {
             setPageNum(pageNum);
@@ -126,7 +126,7 @@ export default function CollectionTab() {
           simple: true,
           size: 'small',
           showTotal(total, range) {
-            return `${range[0]}-${range[1]} / ${total}`;
+            return `${range[0]}-${range[1]} / ${total}${data?.data.totalCapped ? '+' : ''}`;
           },
           onChange(pageNum, pageSize) {
             setPageNum(pageNum);
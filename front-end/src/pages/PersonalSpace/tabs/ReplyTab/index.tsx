@@ -141,7 +141,7 @@ export default function ReplyTab() {
           simple: true,
           size: 'small',
           showTotal(total, range) {
-            return `${range[0]}-${range[1]} / ${total}`;
+            return `${range[0]}-${range[1]} / ${total}${data?.data.totalCapped ? '+' : ''}`;
           },
           onChange(pageNum, pageSize) {
             setPageNum(pageNum);
@@ -9,6 +9,7 @@ import {
   getSubmission,
   updSubmission,
 } from '../../../../services/user';
+import { getContent } from '../../../../services/article';
 import ErrorNotification from '../../../../components/ErrorNotification';
 import type { IErrorNotification } from '../../../../components/ErrorNotification';
 import SuccessMessage from '../../../../components/SuccessMessage';
@@ -85,6 +86,27 @@ export default function SubmissionTab() {
     },
   });
 
+  // 列表中不包含文章正文，打开时再按需加载
+  const { run: contentRun, loading: contentLoading } = useRequest(getContent, {
+    manual: true,
+    onSuccess(data) {
+      if (data.success) {
+        setArticleContent(
+          convertFromRaw(
+            JSON.parse(data.data.content) as RawDraftContentState
+          ).getPlainText()
+        );
+      } else {
+        setOpen(false);
+        errorRef.current!.open(data.data.error);
+      }
+    },
+    onError(err) {
+      setOpen(false);
+      errorRef.current!.open(err);
+    },
+  });
+
   const columns: TableProps<SubmissionObj>['columns'] = useMemo(
     () => [
       {
@@ -95,7 +117,7 @@ export default function SubmissionTab() {
       {
         title: t('personal.submission.content'),
         key: 'content',
-        render(_, { title, content, preview, cover, video }) {
+        render(_, { id, title, preview, cover, video }) {
           if (video) {
             return (
               <Image
@@ -111,17 +133,14 @@ export default function SubmissionTab() {
               />
             );
           } else {
-            const text = convertFromRaw(
-              JSON.parse(content!) as RawDraftContentState
-            ).getPlainText();
-
             return (
               <a
                 onClick={(e) => {
                   e.preventDefault();
                   setArticleTitle(title);
-                  setArticleContent(text);
+                  setArticleContent('');
                   setOpen(true);
+                  contentRun({ id });
                 }}
               >
                 {preview!.length > 50
@@ -194,7 +213,7 @@ export default function SubmissionTab() {
         },
       },
     ],
-    [delRun, statusText, t, updRun]
+    [contentRun, delRun, statusText, t, updRun]
   );
 
   return (
@@ -205,7 +224,7 @@ export default function SubmissionTab() {
         open={open}
         onCancel={() => setOpen(false)}
       >
-        {articleContent}
+        {contentLoading ? <LoadingOutlined /> : articleContent}
       </Modal>
       <ErrorNotification ref={errorRef} />
       <SuccessMessage ref={successRef} />
@@ -227,7 +246,7 @@ export default function SubmissionTab() {
           simple: true,
           size: 'small',
           showTotal(total, range) {
-            return `${range[0]}-${range[1]} / ${total}`;
+            return `${range[0]}-${range[1]} / ${total}${data?.data.totalCapped ? '+' : ''}`;
           },
           onChange(pageNum, pageSize) {
             setPageNum(pageNum);
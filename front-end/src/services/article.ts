@@ -5,13 +5,22 @@ export async function submit(data: ArticleSubmitReq): Response {
 }
 
 export async function get(data: CommonReq): Response<ArticleGetRes> {
+  // 未登录时使用可缓存的GET接口
+  if (!sessionStorage.getItem('token'))
+    return await request.get('/article/get', { params: { id: data.id } });
   return await request.post('/article/get', data);
 }
 
+export async function getContent(
+  data: CommonReq
+): Response<ArticleGetContentRes> {
+  return await request.post('/article/getContent', data);
+}
+
 export async function getAll(
   data: CommonListReq
 ): Response<CommonListRes<SubmissionPreviewObj>> {
-  return await request.post('/article/getAll', data);
+  return await request.get('/article/getAll', { params: data });
 }
 
 export async function summary(
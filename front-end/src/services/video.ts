@@ -7,9 +7,12 @@ export async function submit(data: VideoSubmitReq): Response {
 export async function getAll(
   data: CommonListReq
 ): Response<CommonListRes<SubmissionPreviewObj>> {
-  return await request.post('/video/getAll', data);
+  return await request.get('/video/getAll', { params: data });
 }
 
 export async function get(data: CommonReq): Response<VideoGetRes> {
+  // 未登录时使用可缓存的GET接口
+  if (!sessionStorage.getItem('token'))
+    return await request.get('/video/get', { params: { id: data.id } });
   return await request.post('/video/get', data);
 }
@@ -2,10 +2,16 @@ interface CommonListReq {
   uid?: string;
   pageNum: number;
   pageSize: number;
+  cursor?: string;
+  withTotal?: boolean;
 }
 
 interface CommonListRes<T> {
-  total?: number;
+  total?: number | null;
+  // 总数达到服务端统计上限时为true，total只是下限
+  totalCapped?: boolean;
+  hasMore?: boolean;
+  cursor?: string | null;
   dataList?: T[];
 }
 
@@ -99,7 +105,6 @@ interface SubmissionObj {
   id: string;
   submitTime: number;
   title: string;
-  content?: string;
   preview?: string;
   cover?: string;
   video?: string;
@@ -114,6 +119,7 @@ interface CollectionObj {
   title: string;
   type: number;
   preview: string;
+  deleted?: boolean;
 }
 
 interface VideoGetRes {
@@ -147,6 +153,10 @@ interface ArticleGetRes {
   content?: string;
 }
 
+interface ArticleGetContentRes {
+  content: string;
+}
+
 interface UserIsFollowedRes {
   followed?: boolean;
 }